@@ -0,0 +1,112 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import counts
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from posts.search import search
+from posts.tests.fixtures import commit_callbacks
+
+
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(author=cls.reader, text='Пост')
+        cls.URL = reverse('api:v1:batch')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def send(self, data, client=None):
+        return (client or self.author_client).post(
+            self.URL, json.dumps(data), content_type='application/json'
+        )
+
+    def commit(self, data):
+        with commit_callbacks():
+            return self.send(data)
+
+    def test_posts_created_with_side_effects(self):
+        response = self.send({'posts': [
+            {'text': 'Первый пакетный', 'group': self.group.pk},
+            {'text': ''},
+            {'text': 'Второй пакетный'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['posts']
+        self.assertIn('text', results[1]['errors'])
+        created = Post.objects.filter(
+            pk__in=[results[0]['id'], results[2]['id']]
+        ).order_by('pk')
+        self.assertEqual(
+            [post.text for post in created],
+            ['Первый пакетный', 'Второй пакетный']
+        )
+        self.assertEqual(created[0].group, self.group)
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).profile.post_count, 2
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertEqual(
+            list(search('пакетный').values_list('pk', flat=True).order_by(
+                'pk'
+            )),
+            [post.pk for post in created]
+        )
+        index = self.author_client.get(reverse('posts:index'))
+        self.assertContains(index, 'Второй пакетный')
+
+    def test_cache_changes_wait_for_commit(self):
+        counts.set_count(counts.ALL_POSTS, 1)
+        self.send({'posts': [{'text': 'До коммита'}]})
+        self.assertEqual(counts.peek(counts.ALL_POSTS), 1)
+        self.commit({'posts': [{'text': 'После коммита'}]})
+        self.assertEqual(counts.peek(counts.ALL_POSTS), 2)
+
+    def test_comments_update_post_counter(self):
+        self.author_client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        results = self.commit({'comments': [
+            {'post': self.post.pk, 'text': 'Раз'},
+            {'post': self.post.pk, 'text': 'Два'},
+            {'post': 0, 'text': 'Некуда'},
+        ]}).json()['comments']
+        self.assertIn('post', results[2]['errors'])
+        self.assertEqual(
+            sorted(
+                Comment.objects.filter(post=self.post).values_list(
+                    'pk', flat=True
+                )
+            ),
+            [results[0]['id'], results[1]['id']]
+        )
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 2)
+        page = self.author_client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertContains(page, 'Два')
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.send({'posts': []}, Client()).status_code, 401)
+        response = self.author_client.post(
+            self.URL, 'не json', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.send({'posts': {}}).status_code, 400)
+        with self.settings(API_BATCH_LIMIT=1):
+            response = self.send({'posts': [{'text': 'а'}, {'text': 'б'}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
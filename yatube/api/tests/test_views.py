@@ -0,0 +1,142 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}',
+                group=cls.group if number % 2 else None
+            )
+            for number in range(5)
+        ]
+        cls.post = cls.posts[-1]
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Коммент {number}'
+            )
+        cls.POSTS_URL = reverse('api:v1:posts')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_posts_walk_by_cursor(self):
+        texts = []
+        params = {'limit': 2, 'fields': 'text'}
+        while True:
+            data = self.client.get(self.POSTS_URL, params).json()
+            texts += [item['text'] for item in data['results']]
+            self.assertTrue(all(
+                list(item) == ['text'] for item in data['results']
+            ))
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(
+            texts, [f'Пост {number}' for number in range(4, -1, -1)]
+        )
+
+    def test_post_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.POSTS_URL).json()
+        first = data['results'][0]
+        self.assertEqual(first['author'], 'author')
+        self.assertIsNone(first['group'])
+        self.assertEqual(data['results'][1]['group'], 'group')
+        self.assertEqual(first['comment_count'], 3)
+        self.assertIsNone(first['image'])
+
+    def test_filters(self):
+        data = self.client.get(self.POSTS_URL, {'group': 'group'}).json()
+        self.assertEqual(len(data['results']), 2)
+        data = self.client.get(self.POSTS_URL, {'author': 'reader'}).json()
+        self.assertEqual(data['results'], [])
+
+    def test_unknown_field_is_bad_request(self):
+        response = self.client.get(self.POSTS_URL, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_details(self):
+        post = self.client.get(
+            reverse('api:v1:post', args=[self.post.pk]), {'fields': 'id'}
+        ).json()
+        self.assertEqual(post, {'id': self.post.pk})
+        profile = self.client.get(
+            reverse('api:v1:profile', args=['author'])
+        ).json()
+        self.assertEqual(profile['post_count'], 5)
+        self.assertEqual(profile['last_name'], 'Толстой')
+        groups = self.client.get(reverse('api:v1:groups')).json()
+        self.assertEqual(groups['results'][0]['slug'], 'group')
+        comments = self.client.get(
+            reverse('api:v1:comments', args=[self.post.pk])
+        ).json()
+        self.assertEqual(
+            [item['text'] for item in comments['results']],
+            ['Коммент 0', 'Коммент 1', 'Коммент 2']
+        )
+
+    def test_missing_objects_return_json_404(self):
+        for url in (
+            reverse('api:v1:post', args=[0]),
+            reverse('api:v1:comments', args=[0]),
+            reverse('api:v1:profile', args=['nobody']),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_follow_feed_requires_login(self):
+        url = reverse('api:v1:follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        data = self.reader_client.get(url).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIn('private', self.reader_client.get(url)['Cache-Control'])
+
+    def test_etag_and_revalidation(self):
+        response = self.client.get(self.POSTS_URL)
+        self.assertIn('public', response['Cache-Control'])
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.POSTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(
+            self.client.get(
+                self.POSTS_URL, HTTP_IF_NONE_MATCH=etag
+            ).status_code, 200
+        )
+
+    @override_settings(API_PAGE_SIZE=100)
+    def test_gzip(self):
+        for number in range(30):
+            Post.objects.create(author=self.author, text='Текст ' * 20)
+        response = self.client.get(
+            self.POSTS_URL, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 35)
+
+    def test_writes_not_allowed(self):
+        self.assertEqual(self.client.post(self.POSTS_URL).status_code, 405)
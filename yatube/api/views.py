@@ -0,0 +1,263 @@
+"""API версии 1: посты, группы, профили, комментарии.
+
+Ответ собирается прямо из .values(): объекты моделей не создаются,
+шаблоны не рендерятся. Списки листаются курсором (?cursor=, размер
+страницы — ?limit=), поля выбираются параметром ?fields=id,text.
+JSON без пробелов сжимается gzip, если клиент его принимает. ETag
+строится из тех же версий в кэше, что и у HTML-страниц
+(posts.conditional), поэтому повторный запрос без изменений — 304.
+
+Запись одна — пакетная (batch): пачка постов и комментариев за один
+запрос, см. posts.batch.
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import (condition, require_POST,
+                                          require_safe)
+
+from core.db.routers import replica_reads
+from posts import batch as posts_batch
+from posts import conditional, timeline
+from posts.models import Comment, Group, Post, User
+from posts.paginators import KeysetPaginator
+
+# Поле ответа -> поле для .values().
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+GROUP_FIELDS = {
+    'id': 'pk',
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+}
+PROFILE_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'post_count': 'profile__post_count',
+    'follower_count': 'profile__follower_count',
+    'following_count': 'profile__following_count',
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        json.dumps(
+            data, cls=DjangoJSONEncoder, ensure_ascii=False,
+            separators=(',', ':')
+        ),
+        content_type='application/json', status=status
+    )
+
+
+def public_etag(version_func):
+    """ETag по версии страницы без учёта пользователя."""
+    def etag(request, *args, **kwargs):
+        version = version_func(request, *args, **kwargs)
+        if version is None:
+            return None
+        return hashlib.md5(f'api:v1:{version}'.encode()).hexdigest()
+    return etag
+
+
+def api_view(etag_func, login_required=False):
+    """GET-представление API: ошибки в JSON, ETag, gzip, реплика.
+
+    Представление с login_required проверяет вход до ETag, иначе аноним
+    получил бы 304 на чужой ETag; его ответы кэшируются только в
+    браузере.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def handle(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except BadRequest as error:
+                return json_response({'error': str(error)}, 400)
+            except Http404:
+                return json_response({'error': 'Не найдено'}, 404)
+
+        handle = cache_control(
+            max_age=settings.API_CACHE_MAX_AGE,
+            **({'private': True} if login_required else {'public': True})
+        )(condition(etag_func=etag_func)(handle))
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if login_required and not request.user.is_authenticated:
+                return json_response({'error': 'Требуется вход'}, 401)
+            return handle(request, *args, **kwargs)
+        return gzip_page(require_safe(replica_reads(wrapper)))
+    return decorator
+
+
+def _fields(request, available):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name for name in raw.split(',') if name]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+
+def _serialize(rows, fields, available):
+    items = [
+        {name: row[available[name]] for name in fields} for row in rows
+    ]
+    if 'image' in fields:
+        for item in items:
+            item['image'] = (
+                default_storage.url(item['image']) if item['image'] else None
+            )
+    return items
+
+
+def _list(request, queryset, available, keys, descending=True):
+    """Страница списка по курсору: results и next_cursor."""
+    fields = _fields(request, available)
+    lookups = {available[name] for name in fields} | set(keys)
+    page = KeysetPaginator(
+        queryset.values(*lookups), _limit(request), keys, descending
+    ).get_page(request.GET.get('cursor'))
+    return {
+        'results': _serialize(page, fields, available),
+        'next_cursor': page.next_cursor,
+    }
+
+
+def _detail(request, queryset, available):
+    fields = _fields(request, available)
+    row = queryset.values(*{available[name] for name in fields}).first()
+    if row is None:
+        raise Http404
+    return json_response(_serialize([row], fields, available)[0])
+
+
+@api_view(public_etag(conditional.index_version))
+def posts(request):
+    """Все посты от новых к старым; ?group=slug и ?author=username."""
+    queryset = Post.objects.all()
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    return json_response(
+        _list(request, queryset, POST_FIELDS, ('pub_date', 'pk'))
+    )
+
+
+@api_view(public_etag(conditional.post_version))
+def post(request, post_id):
+    return _detail(request, Post.objects.filter(pk=post_id), POST_FIELDS)
+
+
+@api_view(public_etag(conditional.post_version))
+def comments(request, post_id):
+    data = _list(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        ('created', 'pk'), descending=False
+    )
+    # Пустая страница у несуществующего поста — 404, а не пустой список.
+    if not data['results'] and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return json_response(data)
+
+
+@api_view(public_etag(conditional.groups_version))
+def groups(request):
+    return json_response(_list(
+        request, Group.objects.all(), GROUP_FIELDS, ('pk',), descending=False
+    ))
+
+
+@api_view(public_etag(conditional.profile_version))
+def profile(request, username):
+    return _detail(
+        request, User.objects.filter(username=username), PROFILE_FIELDS
+    )
+
+
+@api_view(conditional.follow_etag, login_required=True)
+def follow(request):
+    """Лента подписок текущего пользователя."""
+    return json_response(_list(
+        request, timeline.follow_feed(request.user), POST_FIELDS,
+        ('feed_date', 'pk')
+    ))
+
+
+def _results(results):
+    return [
+        {'id': result.obj.pk} if result.ok else {'errors': result.errors}
+        for result in results
+    ]
+
+
+@require_POST
+def batch(request):
+    """Пачка постов и комментариев: {"posts": [...], "comments": [...]}.
+
+    Пост — поля PostForm без картинки, комментарий — text и post (id).
+    В ответе на каждый элемент id созданного объекта или ошибки формы,
+    в том же порядке.
+    """
+    if not request.user.is_authenticated:
+        return json_response({'error': 'Требуется вход'}, 401)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return json_response({'error': 'Тело запроса — не JSON'}, 400)
+    if not isinstance(data, dict):
+        return json_response({'error': 'Ожидается объект'}, 400)
+    items = {kind: data.get(kind, []) for kind in ('posts', 'comments')}
+    if not all(isinstance(value, list) for value in items.values()):
+        return json_response({'error': 'posts и comments — списки'}, 400)
+    if sum(map(len, items.values())) > settings.API_BATCH_LIMIT:
+        return json_response({
+            'error': f'Не больше {settings.API_BATCH_LIMIT} элементов'
+        }, 400)
+    with transaction.atomic():
+        posts = posts_batch.create_posts(request.user, items['posts'])
+        comments = posts_batch.create_comments(
+            request.user, items['comments']
+        )
+    return json_response({
+        'posts': _results(posts), 'comments': _results(comments)
+    })
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db.sqlite import tune_connection
+        connection_created.connect(
+            tune_connection, dispatch_uid='core.tune_connection'
+        )
@@ -0,0 +1,247 @@
+"""Кэш поверх протокола Redis (RESP) без сторонних зависимостей."""
+import pickle
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# INCRBY создаёт отсутствующий ключ, а incr() кэша Django должен падать:
+# скрипт проверяет ключ и меняет его одной атомарной командой.
+INCR_EXISTING = (
+    "if redis.call('EXISTS', KEYS[1]) == 1 then "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1]) end"
+)
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """Одно TCP-соединение: отправка команд и разбор ответов RESP."""
+
+    def __init__(self, host, port, db=0, timeout=5):
+        self._socket = socket.create_connection((host, port), timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def send(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            arg = self._encode(arg)
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self._socket.sendall(b''.join(parts))
+
+    def read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('Соединение с сервером закрыто')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self.read() for _ in range(length)]
+        raise RedisError(f'Неизвестный ответ: {line!r}')
+
+    def execute(self, *args):
+        self.send(*args)
+        return self.read()
+
+    def close(self):
+        try:
+            # shutdown будит поток, который ждёт ответа в read().
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self._file.close()
+            self._socket.close()
+        except OSError:
+            pass
+
+
+class RedisClient:
+    """Клиент с отдельным соединением на каждый поток."""
+
+    def __init__(self, url, timeout=5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def connect(self):
+        return RedisConnection(self.host, self.port, self.db, self.timeout)
+
+    def execute(self, *args):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self.connect()
+        try:
+            return connection.execute(*args)
+        except (ConnectionError, OSError):
+            # Сервер мог закрыть простаивавшее соединение: одна попытка.
+            connection.close()
+            connection = self._local.connection = self.connect()
+            return connection.execute(*args)
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class RedisCache(BaseCache):
+    """Бэкенд кэша Django для сервера с протоколом Redis.
+
+    Целые числа хранятся строкой, чтобы работал INCRBY; остальное —
+    pickle. Поддерживает PUBLISH/SUBSCRIBE для TieredCache.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._client = RedisClient(location, options.get('SOCKET_TIMEOUT', 5))
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            return pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expiry(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        if expires is None:
+            return ()
+        return ('PX', max(int((expires - time.time()) * 1000), 1))
+
+    def get(self, key, default=None, version=None):
+        value = self._client.execute('GET', self._key(key, version))
+        return default if value is None else self._load(value)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._client.execute(
+            'MGET', *[self._key(key, version) for key in keys]
+        )
+        return {
+            key: self._load(value)
+            for key, value in zip(keys, values) if value is not None
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout == 0:
+            return self.delete(key, version)
+        self._client.execute(
+            'SET', self._key(key, version), self._dump(value),
+            *self._expiry(timeout)
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._client.execute(
+            'SET', self._key(key, version), self._dump(value),
+            *self._expiry(timeout), 'NX'
+        ) == 'OK'
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self.get_backend_timeout(timeout) is None:
+            return bool(self._client.execute('PERSIST', key)) or bool(
+                self._client.execute('EXISTS', key)
+            )
+        return bool(
+            self._client.execute('PEXPIRE', key, self._expiry(timeout)[1])
+        )
+
+    def delete(self, key, version=None):
+        self._client.execute('DEL', self._key(key, version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._client.execute('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return bool(self._client.execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        try:
+            value = self._client.execute(
+                'EVAL', INCR_EXISTING, 1, key, delta
+            )
+        except RedisError as error:
+            raise ValueError(str(error))
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        return value
+
+    def clear(self):
+        self._client.execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # Соединения живут в потоке и переиспользуются между запросами.
+        pass
+
+    def publish(self, channel, message):
+        self._client.execute('PUBLISH', channel, message)
+
+    def subscribe(self, channel, callback):
+        """Слушает канал в фоновом потоке и вызывает callback(message)."""
+        connection = self._client.connect()
+        connection._socket.settimeout(None)
+        connection.execute('SUBSCRIBE', channel)
+
+        def listen():
+            while True:
+                try:
+                    reply = connection.read()
+                except (ConnectionError, OSError):
+                    return
+                if reply and reply[0] == b'message':
+                    callback(reply[2].decode())
+
+        thread = threading.Thread(target=listen, daemon=True)
+        thread.start()
+        return connection
@@ -0,0 +1,207 @@
+"""Локальный сервер с протоколом Redis для тестов и разработки.
+
+Хранит данные в памяти процесса и понимает только команды, которые
+нужны RedisCache и TieredCache.
+"""
+import socketserver
+import threading
+import time
+
+from .redis import INCR_EXISTING
+
+
+class _Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.expires = {}
+        self.subscribers = {}
+
+    def alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _write(self, value):
+        self.wfile.write(self._encode(value))
+
+    def _encode(self, value):
+        if value is None:
+            return b'$-1\r\n'
+        if isinstance(value, Exception):
+            return b'-ERR %s\r\n' % str(value).encode()
+        if isinstance(value, bool):
+            return b':%d\r\n' % value
+        if isinstance(value, int):
+            return b':%d\r\n' % value
+        if isinstance(value, str):
+            return b'+%s\r\n' % value.encode()
+        if isinstance(value, list):
+            return b'*%d\r\n' % len(value) + b''.join(
+                self._encode(item) for item in value
+            )
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            name = args[0].upper().decode()
+            if name == 'SUBSCRIBE':
+                return self._subscribe(store, args[1:])
+            with store.lock:
+                try:
+                    reply = getattr(self, f'cmd_{name.lower()}')(
+                        store, *args[1:]
+                    )
+                except AttributeError:
+                    reply = ValueError(f'unknown command {name}')
+                except (TypeError, ValueError) as error:
+                    reply = ValueError(str(error))
+            self._write(reply)
+
+    def _subscribe(self, store, channels):
+        lock = threading.Lock()
+        with store.lock:
+            for index, channel in enumerate(channels, 1):
+                store.subscribers.setdefault(channel, []).append(
+                    (self.wfile, lock)
+                )
+                self._write([b'subscribe', channel, index])
+        while self.rfile.readline():
+            pass
+        with store.lock:
+            for channel in channels:
+                store.subscribers[channel] = [
+                    item for item in store.subscribers[channel]
+                    if item[0] is not self.wfile
+                ]
+
+    def cmd_ping(self, store, *args):
+        return 'PONG'
+
+    def cmd_select(self, store, db):
+        return 'OK'
+
+    def cmd_get(self, store, key):
+        return store.data[key] if store.alive(key) else None
+
+    def cmd_mget(self, store, *keys):
+        return [self.cmd_get(store, key) for key in keys]
+
+    def cmd_set(self, store, key, value, *options):
+        options = [option.upper() for option in options]
+        exists = store.alive(key)
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        store.data[key] = value
+        store.expires.pop(key, None)
+        if b'PX' in options:
+            milliseconds = int(options[options.index(b'PX') + 1])
+            store.expires[key] = time.monotonic() + milliseconds / 1000
+        return 'OK'
+
+    def cmd_del(self, store, *keys):
+        removed = 0
+        for key in keys:
+            if store.alive(key):
+                removed += 1
+            store.data.pop(key, None)
+            store.expires.pop(key, None)
+        return removed
+
+    def cmd_exists(self, store, *keys):
+        return sum(store.alive(key) for key in keys)
+
+    def cmd_incrby(self, store, key, delta):
+        value = int(store.data[key]) if store.alive(key) else 0
+        value += int(delta)
+        store.data[key] = str(value).encode()
+        return value
+
+    def cmd_eval(self, store, script, numkeys, *args):
+        if script.decode() != INCR_EXISTING:
+            raise ValueError('unsupported script')
+        key, delta = args
+        return self.cmd_incrby(store, key, delta) if store.alive(key) else None
+
+    def cmd_pexpire(self, store, key, milliseconds):
+        if not store.alive(key):
+            return 0
+        store.expires[key] = time.monotonic() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_persist(self, store, key):
+        return int(
+            store.alive(key) and store.expires.pop(key, None) is not None
+        )
+
+    def cmd_flushdb(self, store):
+        store.data.clear()
+        store.expires.clear()
+        return 'OK'
+
+    def cmd_publish(self, store, channel, message):
+        receivers = store.subscribers.get(channel, [])
+        payload = self._encode([b'message', channel, message])
+        for wfile, lock in receivers:
+            with lock:
+                try:
+                    wfile.write(payload)
+                except OSError:
+                    pass
+        return len(receivers)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalRedisServer:
+    """Запускает сервер в фоновом потоке: `with LocalRedisServer() as url`."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = _Server((host, port), _Handler)
+        self._server.store = _Store()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,169 @@
+"""Двухуровневый кэш: L1 в памяти процесса и общий L2.
+
+Чтения обслуживаются из L1 (LRU в памяти), промахи идут в L2. L1 и
+подписка на канал — одни на процесс и LOCATION кэша. Каждая
+запись и удаление проходят через L2 и рассылаются другим процессам
+сообщением в канал, после которого они выбрасывают ключ из своего L1.
+Если L2 не умеет PUBLISH/SUBSCRIBE, устаревание L1 ограничено его
+коротким TIMEOUT.
+"""
+import json
+import threading
+import time
+import uuid
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+_MISSING = object()
+
+_nodes = {}
+_nodes_lock = threading.Lock()
+
+
+class _Node:
+    """L1 и подписка процесса, общие для экземпляров кэша всех потоков.
+
+    Django создаёт экземпляр бэкенда на каждый поток; без общего узла у
+    каждого потока был бы свой L1 и своё соединение с подпиской.
+    """
+
+    def __init__(self, location, options):
+        self.id = uuid.uuid4().hex
+        self.l1 = LocMemCache(f'tiered-{location}-{self.id}', {
+            'TIMEOUT': options.get('L1_TIMEOUT', 5),
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000),
+            },
+        })
+        self.lock = threading.Lock()
+        self.subscription = None
+
+    def on_message(self, message):
+        node, keys, version = json.loads(message)
+        if node == self.id:
+            return
+        if keys is None:
+            self.l1.clear()
+        else:
+            self.l1.delete_many(keys, version=version)
+
+
+def _get_node(location, options):
+    with _nodes_lock:
+        node = _nodes.get(location)
+        if node is None:
+            node = _nodes[location] = _Node(location, options)
+    return node
+
+
+def close_all():
+    """Закрывает подписки и забывает L1 всех узлов процесса."""
+    with _nodes_lock:
+        for node in _nodes.values():
+            if node.subscription is not None:
+                node.subscription.close()
+        _nodes.clear()
+
+
+class TieredCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', 'shared')
+        self._channel = options.get('CHANNEL', 'cache-invalidation')
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._node = _get_node(location, options)
+        self._l1 = self._node.l1
+
+    @property
+    def l2(self):
+        cache = caches[self._l2_alias]
+        node = self._node
+        if node.subscription is None and hasattr(cache, 'subscribe'):
+            with node.lock:
+                if node.subscription is None:
+                    node.subscription = cache.subscribe(
+                        self._channel, node.on_message
+                    )
+        return cache
+
+    def _invalidate(self, keys, version=None):
+        if keys is None:
+            self._l1.clear()
+        else:
+            self._l1.delete_many(keys, version=version)
+        l2 = self.l2
+        if hasattr(l2, 'publish'):
+            l2.publish(
+                self._channel, json.dumps([self._node.id, keys, version])
+            )
+
+    def get(self, key, default=None, version=None):
+        value = self._l1.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            value = self.l2.get(key, _MISSING, version=version)
+            if value is _MISSING:
+                return default
+            self._l1.set(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = self._l1.get_many(keys, version=version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.l2.get_many(missing, version=version)
+            self._l1.set_many(shared, version=version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self._invalidate([key], version)
+        self._l1.set(key, value, self._l1_ttl(timeout), version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        self._invalidate(list(data), version)
+        self._l1.set_many(data, self._l1_ttl(timeout), version=version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._invalidate([key], version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.l2.delete(key, version=version)
+        self._invalidate([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(keys, version=version)
+        self._invalidate(keys, version)
+
+    def has_key(self, key, version=None):
+        return self._l1.has_key(key, version=version) or self.l2.has_key(
+            key, version=version
+        )
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        self._invalidate([key], version)
+        return value
+
+    def clear(self):
+        self.l2.clear()
+        self._invalidate(None)
+
+    def _l1_ttl(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        if expires is None:
+            return self._l1_timeout
+        return min(expires - time.time(), self._l1_timeout)
@@ -0,0 +1,41 @@
+"""SQLite с пулом соединений core.db.pool.
+
+Новое соединение Django берёт готовое соединение sqlite3 из пула
+(с уже зарегистрированными функциями и прагмами), а при закрытии
+откатывает незавершённую транзакцию и возвращает его в пул. Базы в
+памяти работают как в обычном бэкенде.
+"""
+from django.db.backends.sqlite3 import base
+
+from ... import pool as pools
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Взято ли текущее соединение из пула готовым (для connection_created).
+    reused_connection = False
+
+    @property
+    def pool(self):
+        return pools.get_pool(self.alias, self.settings_dict['NAME'])
+
+    def get_new_connection(self, conn_params):
+        if self.is_in_memory_db():
+            self.reused_connection = False
+            return super().get_new_connection(conn_params)
+        connection, self.reused_connection = self.pool.checkout(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.is_in_memory_db():
+            return super()._close()
+        broken = False
+        try:
+            if self.connection.in_transaction:
+                self.connection.rollback()
+        except base.Database.Error:
+            broken = True
+        self.pool.checkin(self.connection, broken)
@@ -0,0 +1,127 @@
+"""Сравнение конкурентного доступа к SQLite с прагмами и без.
+
+Несколько потоков читают случайные строки, один поток пишет по строке
+в транзакции — как комментарии и посты в представлениях. Каждый поток
+открывает своё соединение к временному файлу базы.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from core.metrics import percentile
+
+from .sqlite import apply_pragmas
+
+TIMEOUT = 5
+
+
+def _prepare(path, rows, pragmas):
+    connection = sqlite3.connect(path, timeout=TIMEOUT)
+    apply_pragmas(connection, pragmas)
+    connection.execute(
+        'CREATE TABLE items (id INTEGER PRIMARY KEY, author INTEGER, '
+        'body TEXT)'
+    )
+    connection.execute('CREATE INDEX items_author ON items (author)')
+    connection.executemany(
+        'INSERT INTO items (author, body) VALUES (?, ?)',
+        ((num % 100, 'x' * 200) for num in range(rows))
+    )
+    connection.commit()
+    connection.close()
+
+
+def _loop(path, pragmas, deadline, operation, results):
+    connection = sqlite3.connect(path, timeout=TIMEOUT)
+    apply_pragmas(connection, pragmas)
+    rng = random.Random(threading.get_ident())
+    latencies = []
+    errors = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            operation(connection, rng)
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    results.append((latencies, errors))
+
+
+def _read(connection, rng):
+    connection.execute(
+        'SELECT id, body FROM items WHERE author = ? '
+        'ORDER BY id DESC LIMIT 10', (rng.randrange(100),)
+    ).fetchall()
+
+
+def _write(connection, rng):
+    with connection:
+        connection.execute(
+            'INSERT INTO items (author, body) VALUES (?, ?)',
+            (rng.randrange(100), 'y' * 200)
+        )
+
+
+def _stats(results, elapsed):
+    latencies = [value for rows, _ in results for value in rows]
+    return {
+        'ops': len(latencies),
+        'ops_per_s': round(len(latencies) / elapsed, 1),
+        'errors': sum(errors for _, errors in results),
+        'p50_ms': round(percentile(latencies, 50), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 3) if latencies else None,
+    }
+
+
+def run(pragmas, readers=4, writers=1, duration=2.0, rows=20000):
+    """Гоняет читателей и писателей duration секунд; возвращает сводку."""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.sqlite3')
+    try:
+        _prepare(path, rows, pragmas)
+        reads, writes = [], []
+        started = time.perf_counter()
+        deadline = started + duration
+        threads = [
+            threading.Thread(target=_loop, args=(
+                path, pragmas, deadline, _read, reads
+            ))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(target=_loop, args=(
+                path, pragmas, deadline, _write, writes
+            ))
+            for _ in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    return {'reads': _stats(reads, elapsed), 'writes': _stats(writes, elapsed)}
+
+
+def compare(tuned_pragmas, **options):
+    """Одинаковая нагрузка без прагм и с ними, плюс отношение ops/s."""
+    simple = run({}, **options)
+    tuned = run(tuned_pragmas, **options)
+    return {
+        'simple': simple,
+        'tuned': tuned,
+        'speedup': {
+            kind: round(
+                tuned[kind]['ops_per_s'] / max(simple[kind]['ops_per_s'], 1),
+                2
+            )
+            for kind in ('reads', 'writes')
+        },
+    }
@@ -0,0 +1,194 @@
+"""Ограниченный пул соединений с базой на процесс.
+
+Соединение берётся из пула на время жизни соединения Django (обычно
+один запрос) и возвращается при закрытии. Каждый поток работает со
+своим соединением Django, поэтому одно соединение пула в каждый момент
+принадлежит одному потоку; пул защищён блокировкой. Простоявшее дольше
+CHECK_AFTER секунд соединение проверяется запросом SELECT 1, старше
+MAX_LIFETIME — закрывается. Если все SIZE соединений заняты, поток
+ждёт освобождения не дольше TIMEOUT секунд.
+"""
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class _Entry:
+    __slots__ = ('raw', 'created', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created = self.last_used = time.monotonic()
+
+
+class Pool:
+    def __init__(self, size, max_lifetime, check_after, timeout):
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.timeout = timeout
+        self._idle = deque()
+        self._busy = {}
+        self._opened = 0
+        self._condition = threading.Condition()
+        self._counters = Counter()
+        self._max_wait = 0
+
+    def _expired(self, entry, now):
+        return now - entry.created > self.max_lifetime
+
+    def _healthy(self, entry, now):
+        if now - entry.last_used < self.check_after:
+            return True
+        self._counters['health_checks'] += 1
+        try:
+            entry.raw.execute('SELECT 1').fetchone()
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, entry):
+        self._opened -= 1
+        self._counters['discarded'] += 1
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+
+    def _take_idle(self):
+        now = time.monotonic()
+        while self._idle:
+            # LIFO: самое свежее соединение, старые доживают до MAX_LIFETIME.
+            entry = self._idle.pop()
+            if self._expired(entry, now) or not self._healthy(entry, now):
+                self._discard(entry)
+                continue
+            return entry
+        return None
+
+    def checkout(self, connect):
+        """(соединение, взято ли готовое из пула).
+
+        connect() открывает новое соединение, если свободных нет, а
+        лимит SIZE не достигнут.
+        """
+        started = time.monotonic()
+        waited = False
+        with self._condition:
+            while True:
+                entry = self._take_idle()
+                if entry is not None:
+                    self._busy[id(entry.raw)] = entry
+                    self._checked_out(started, waited, reused=True)
+                    return entry.raw, True
+                if self._opened < self.size:
+                    self._opened += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolExhausted(
+                        f'Все {self.size} соединений заняты дольше '
+                        f'{self.timeout} с'
+                    )
+                waited = True
+                self._condition.wait(remaining)
+        try:
+            raw = connect()
+        except Exception:
+            with self._condition:
+                self._opened -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._busy[id(raw)] = _Entry(raw)
+            self._counters['created'] += 1
+            self._checked_out(started, waited, reused=False)
+        return raw, False
+
+    def _checked_out(self, started, waited, reused):
+        self._counters['checkouts'] += 1
+        if reused:
+            self._counters['reused'] += 1
+        if waited:
+            wait = (time.monotonic() - started) * 1000
+            self._counters['waits'] += 1
+            self._counters['wait_ms'] += wait
+            self._max_wait = max(self._max_wait, wait)
+
+    def checkin(self, raw, broken=False):
+        with self._condition:
+            entry = self._busy.pop(id(raw), None)
+            if entry is None:
+                return
+            now = time.monotonic()
+            if broken or self._expired(entry, now):
+                self._discard(entry)
+            else:
+                entry.last_used = now
+                self._idle.append(entry)
+            self._condition.notify()
+
+    def close(self):
+        """Закрывает свободные соединения; занятые закроются при возврате."""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop())
+            self.max_lifetime = -1
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'open': self._opened,
+                'idle': len(self._idle),
+                'in_use': len(self._busy),
+                'checkouts': self._counters['checkouts'],
+                'reused': self._counters['reused'],
+                'created': self._counters['created'],
+                'discarded': self._counters['discarded'],
+                'health_checks': self._counters['health_checks'],
+                'waits': self._counters['waits'],
+                'wait_ms': round(self._counters['wait_ms'], 2),
+                'max_wait_ms': round(self._max_wait, 2),
+                'timeouts': self._counters['timeouts'],
+            }
+
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_pool(alias, name):
+    with _lock:
+        pool = _pools.get((alias, name))
+        if pool is None:
+            options = settings.DATABASE_POOL
+            pool = _pools[alias, name] = Pool(
+                options['SIZE'], options['MAX_LIFETIME'],
+                options['CHECK_AFTER'], options['TIMEOUT'],
+            )
+        return pool
+
+
+def stats():
+    with _lock:
+        pools = dict(_pools)
+    return {
+        f'{alias}:{name}': pool.stats()
+        for (alias, name), pool in pools.items()
+    }
+
+
+def close_all():
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,41 @@
+"""Маршрутизация чтений представлений только для чтения на реплику."""
+import functools
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_reads(view):
+    """Чтения внутри представления идут в DATABASE_REPLICA.
+
+    Запись в таком представлении всё равно уходит в основную базу.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICA and _replica_reads.get():
+            return settings.DATABASE_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — тот же файл базы, объекты из неё можно связывать.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == settings.DATABASE_REPLICA:
+            return False
+        return None
@@ -0,0 +1,40 @@
+"""Настройка соединений SQLite под нагрузку.
+
+Режим WAL позволяет читателям работать параллельно с писателем, а
+synchronous=NORMAL в WAL не теряет целостность базы при сбое, только
+последние транзакции. Остальные прагмы — размер кэша страниц,
+чтение через mmap и ожидание блокировки вместо ошибки
+«database is locked».
+"""
+from django.conf import settings
+
+# Прагмы, которые меняют файл базы: на соединении только для чтения
+# их выполнить нельзя.
+WRITE_PRAGMAS = ('journal_mode',)
+
+
+def apply_pragmas(database, pragmas, read_only=False):
+    """database — соединение или курсор sqlite3."""
+    for name, value in pragmas.items():
+        if read_only and name in WRITE_PRAGMAS:
+            continue
+        database.execute(f'PRAGMA {name} = {value}')
+
+
+def is_read_only(settings_dict):
+    return 'mode=ro' in str(settings_dict['NAME'])
+
+
+def tune_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: прагмы SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    if getattr(connection, 'reused_connection', False):
+        # Соединение из пула уже настроено.
+        return
+    # Напрямую через sqlite3: прагмы не считаются запросами
+    # представления в QueryBudgetMiddleware.
+    apply_pragmas(
+        connection.connection, settings.SQLITE_PRAGMAS,
+        is_read_only(connection.settings_dict)
+    )
@@ -0,0 +1,27 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентные чтения и запись в SQLite без прагм и '
+        'с SQLITE_TUNED_PRAGMAS на временной базе; выводит JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--duration', type=float, default=3.0)
+        parser.add_argument('--rows', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        report = benchmark.compare(
+            settings.SQLITE_TUNED_PRAGMAS,
+            readers=options['readers'], writers=options['writers'],
+            duration=options['duration'], rows=options['rows'],
+        )
+        self.stdout.write(json.dumps(report, indent=2))
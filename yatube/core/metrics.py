@@ -0,0 +1,55 @@
+"""Кольцевой буфер замеров запросов и перцентили по представлениям."""
+import math
+import threading
+from collections import deque, namedtuple
+
+from django.conf import settings
+
+Sample = namedtuple(
+    'Sample', 'queries duplicates similar db_ms template_ms total_ms'
+)
+
+PERCENTILES = (50, 95, 99)
+
+_lock = threading.Lock()
+_samples = {}
+
+
+def record(view_name, sample):
+    with _lock:
+        buffer = _samples.get(view_name)
+        if buffer is None:
+            buffer = _samples[view_name] = deque(
+                maxlen=settings.QUERY_STATS_BUFFER
+            )
+        buffer.append(sample)
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def percentile(values, pct):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def report():
+    """Сводка по каждому представлению: число замеров и перцентили."""
+    with _lock:
+        snapshot = {name: list(buffer) for name, buffer in _samples.items()}
+    result = {}
+    for name, samples in sorted(snapshot.items()):
+        metrics = {'count': len(samples)}
+        for field in Sample._fields:
+            values = [getattr(sample, field) for sample in samples]
+            metrics[field] = {
+                f'p{pct}': round(percentile(values, pct), 2)
+                for pct in PERCENTILES
+            }
+            metrics[field]['max'] = round(max(values), 2)
+        result[name] = metrics
+    return result
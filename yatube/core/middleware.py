@@ -0,0 +1,137 @@
+"""Замер SQL-запросов, времени БД и шаблонов для каждого представления."""
+import functools
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _instrument_templates():
+    """Оборачивает Template.render, чтобы считать время шаблонов.
+
+    Учитывается только внешний шаблон: include внутри него не
+    прибавляет время второй раз.
+    """
+    original = Template.render
+    if getattr(original, 'timed', False):
+        return
+
+    @functools.wraps(original)
+    def render(self, context):
+        if getattr(_local, 'template_depth', None) is None:
+            return original(self, context)
+        _local.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            _local.template_depth -= 1
+            if not _local.template_depth:
+                _local.template_time += time.perf_counter() - started
+
+    render.timed = True
+    Template.render = render
+
+
+class QueryRecorder:
+    """execute_wrapper: запоминает SQL, параметры и время запроса."""
+
+    def __init__(self):
+        self.queries = []
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.queries.append((sql, repr(params)))
+
+    def duplicates(self):
+        """Одинаковые запросы с одинаковыми параметрами."""
+        return sum(
+            count - 1 for count in Counter(self.queries).values()
+        )
+
+    def similar(self):
+        """Сколько раз повторился один SQL с разными параметрами (N+1)."""
+        repeats = Counter(sql for sql, _ in self.queries)
+        return max(repeats.values(), default=0)
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы, дубликаты и время каждого представления.
+
+    Замеры попадают в кольцевой буфер core.metrics и в заголовок
+    Server-Timing. Если для представления задан бюджет в
+    QUERY_BUDGETS и он превышен, при QUERY_BUDGET_RAISE бросается
+    QueryBudgetExceeded, иначе пишется предупреждение в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        _local.template_depth = 0
+        _local.template_time = 0
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            template_time = _local.template_time
+            _local.template_depth = None
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+        sample = metrics.Sample(
+            queries=len(recorder.queries),
+            duplicates=recorder.duplicates(),
+            similar=recorder.similar(),
+            db_ms=recorder.duration * 1000,
+            template_ms=template_time * 1000,
+            total_ms=total * 1000,
+        )
+        metrics.record(match.view_name, sample)
+        response['Server-Timing'] = (
+            f'db;dur={sample.db_ms:.1f};desc="{sample.queries} queries", '
+            f'tpl;dur={sample.template_ms:.1f}, '
+            f'total;dur={sample.total_ms:.1f}'
+        )
+        self.check_budget(match.view_name, sample, recorder)
+        return response
+
+    def check_budget(self, view_name, sample, recorder):
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is None or sample.queries <= budget:
+            return
+        message = (
+            f'{view_name}: {sample.queries} SQL-запросов при бюджете '
+            f'{budget}, повторов одного запроса: {sample.similar}'
+        )
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(
+                message + '\n' + '\n'.join(sql for sql, _ in recorder.queries)
+            )
+        logger.warning(message)
@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from ..cache.redis import RedisCache
+from ..cache.server import LocalRedisServer
+from ..cache.sqlite import SQLiteCache
+from ..cache import tiered
+from ..cache.tiered import TieredCache
+
+
+class CacheBackendContract:
+    """Общие проверки для всех бэкендов кэша."""
+
+    def test_set_get_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_add_and_expiry(self):
+        self.assertTrue(self.cache.add('add', 1, 0.05))
+        self.assertFalse(self.cache.add('add', 2))
+        self.assertEqual(self.cache.get('add'), 1)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('add'))
+        self.assertTrue(self.cache.add('add', 3))
+
+    def test_incr_and_many(self):
+        self.cache.set_many({'a': 1, 'b': 'text'})
+        self.assertEqual(self.cache.incr('a', 5), 6)
+        self.assertEqual(self.cache.get('a'), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 6, 'b': 'text'}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_clear(self):
+        self.cache.set('key', 'value')
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('key'))
+
+
+class SQLiteCacheTests(CacheBackendContract, SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteCache(
+            os.path.join(self.directory, 'cache.sqlite3'), {}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_shared_between_instances(self):
+        other = SQLiteCache(os.path.join(self.directory, 'cache.sqlite3'), {})
+        self.cache.set('shared', 'value')
+        self.assertEqual(other.get('shared'), 'value')
+
+
+class RedisCacheTests(CacheBackendContract, SimpleTestCase):
+    def setUp(self):
+        self.server = LocalRedisServer()
+        self.cache = RedisCache(self.server.start(), {})
+
+    def tearDown(self):
+        self.server.stop()
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.server = LocalRedisServer()
+        self.url = self.server.start()
+        self.settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'shared': {
+                'BACKEND': 'core.cache.redis.RedisCache',
+                'LOCATION': self.url,
+            },
+        })
+        self.settings.enable()
+        options = {'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 60}}
+        self.first = TieredCache('first', options)
+        self.second = TieredCache('second', options)
+
+    def tearDown(self):
+        tiered.close_all()
+        self.settings.disable()
+        self.server.stop()
+
+    def wait_for(self, predicate):
+        deadline = time.monotonic() + 2
+        while not predicate() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return predicate()
+
+    def test_l1_serves_reads_without_l2(self):
+        self.first.set('key', 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(self.first.get('key'), 'value')
+
+    def test_writes_invalidate_other_processes(self):
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertTrue(
+            self.wait_for(lambda: self.second.get('key') == 'new')
+        )
+        self.first.delete('key')
+        self.assertTrue(
+            self.wait_for(lambda: self.second.get('key') is None)
+        )
+
+    def test_threads_share_l1_and_subscription(self):
+        self.first.set('key', 'value')
+        caches['shared'].delete('key')
+        found = []
+
+        def read():
+            cache = TieredCache('first', {'OPTIONS': {'L2': 'shared'}})
+            found.append(cache.get('key'))
+            cache.set('other', 'value')
+
+        threads = [threading.Thread(target=read) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(found, ['value'] * 5)
+        subscribers = self.server._server.store.subscribers
+        self.assertEqual(len(subscribers[b'cache-invalidation']), 1)
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+from posts.models import Post
+
+from ..db import benchmark
+from ..db.routers import ReplicaRouter, replica_reads
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+
+    def wrapper(self, name):
+        settings_dict = dict(connection.settings_dict, NAME=name)
+        wrapper = DatabaseWrapper(settings_dict, alias='pragmas')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS=settings.SQLITE_TUNED_PRAGMAS)
+    def test_pragmas_applied_on_connect(self):
+        wrapper = self.wrapper(self.path)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64000)
+        # synchronous=NORMAL
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+
+        reader = self.wrapper(f'file:{self.path}?mode=ro')
+        self.assertEqual(self.pragma(reader, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(reader, 'busy_timeout'), 5000)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_simple_mode_keeps_defaults(self):
+        wrapper = self.wrapper(self.path)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    @override_settings(DATABASE_REPLICA='replica')
+    def test_reads_in_marked_views_go_to_replica(self):
+        @replica_reads
+        def view():
+            return (
+                self.router.db_for_read(Post),
+                self.router.db_for_write(Post),
+            )
+
+        self.assertEqual(view(), ('replica', 'default'))
+        self.assertIsNone(self.router.db_for_read(Post))
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+
+    @override_settings(DATABASE_REPLICA=None)
+    def test_without_replica_reads_use_default(self):
+        self.assertIsNone(replica_reads(
+            lambda: self.router.db_for_read(Post)
+        )())
+
+
+class SQLiteBenchmarkTests(SimpleTestCase):
+    def test_compare(self):
+        report = benchmark.compare(
+            settings.SQLITE_TUNED_PRAGMAS, readers=2, duration=0.2,
+            rows=500
+        )
+        for mode in ('simple', 'tuned'):
+            self.assertGreater(report[mode]['reads']['ops'], 0)
+            self.assertGreater(report[mode]['writes']['ops'], 0)
+        self.assertIn('reads', report['speedup'])
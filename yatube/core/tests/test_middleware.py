@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+from .. import metrics
+from ..middleware import QueryBudgetExceeded, QueryRecorder
+
+User = get_user_model()
+
+
+class QueryBudgetMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Пост', author=cls.author)
+        cls.INDEX_URL = reverse('posts:index')
+        cls.STATS_URL = reverse('core:query_stats')
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_server_timing_header(self):
+        response = self.client.get(self.INDEX_URL)
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, '
+            r'total;dur=[\d.]+$'
+        )
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.get(self.INDEX_URL)
+        self.client.get(self.INDEX_URL)
+        response = self.client.get(self.STATS_URL)
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(User.objects.create_user(
+            username='staff', is_staff=True
+        ))
+        stats = self.client.get(self.STATS_URL).json()
+        self.assertEqual(stats['posts:index']['count'], 2)
+        self.assertEqual(
+            set(stats['posts:index']['queries']), {'p50', 'p95', 'p99', 'max'}
+        )
+        self.assertGreater(stats['posts:index']['template_ms']['max'], 0)
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 0})
+    def test_budget(self):
+        with self.settings(QUERY_BUDGET_RAISE=True):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.INDEX_URL)
+        cache.clear()
+        with self.settings(QUERY_BUDGET_RAISE=False):
+            with self.assertLogs('core.middleware', 'WARNING'):
+                self.assertEqual(
+                    self.client.get(self.INDEX_URL).status_code, 200
+                )
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_views_fit_budgets(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        post = Post.objects.create(
+            text='Пост в группе', author=self.author, group=group
+        )
+        Comment.objects.create(post=post, author=reader, text='Комментарий')
+        self.client.force_login(reader)
+        urls = (
+            self.INDEX_URL,
+            reverse('posts:group_posts', args=[group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+            reverse('posts:post_comments', args=[post.pk]),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=Пост',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_recorder_counts_repeats(self):
+        recorder = QueryRecorder()
+        recorder.queries = [
+            ('SELECT 1 WHERE id = %s', '(1,)'),
+            ('SELECT 1 WHERE id = %s', '(1,)'),
+            ('SELECT 1 WHERE id = %s', '(2,)'),
+            ('SELECT 2', '()'),
+        ]
+        self.assertEqual(recorder.duplicates(), 1)
+        self.assertEqual(recorder.similar(), 3)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(metrics.percentile(values, 50), 50)
+        self.assertEqual(metrics.percentile(values, 99), 99)
+        self.assertEqual(metrics.percentile([7], 95), 7)
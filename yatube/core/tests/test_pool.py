@@ -0,0 +1,137 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..db import pool as pools
+from ..db.backends.pooled_sqlite3.base import DatabaseWrapper
+
+
+class PoolTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+
+    def connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def make_pool(self, size=2, max_lifetime=60, check_after=60,
+                  timeout=5):
+        pool = pools.Pool(size, max_lifetime, check_after, timeout)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_reuses_connections(self):
+        pool = self.make_pool()
+        raw, reused = pool.checkout(self.connect)
+        self.assertFalse(reused)
+        pool.checkin(raw)
+        again, reused = pool.checkout(self.connect)
+        self.assertTrue(reused)
+        self.assertIs(again, raw)
+        stats = pool.stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_concurrent_checkouts_stay_bounded(self):
+        pool = self.make_pool(size=3)
+        in_use = []
+        peak = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(20):
+                raw, _ = pool.checkout(self.connect)
+                with lock:
+                    in_use.append(raw)
+                    peak.append(len(in_use))
+                raw.execute('SELECT 1').fetchone()
+                time.sleep(0.001)
+                with lock:
+                    in_use.remove(raw)
+                pool.checkin(raw)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = pool.stats()
+        self.assertLessEqual(max(peak), 3)
+        self.assertEqual(stats['checkouts'], 160)
+        self.assertLessEqual(stats['created'], 3)
+        self.assertGreater(stats['waits'], 0)
+        self.assertEqual(stats['in_use'], 0)
+        self.assertEqual(stats['timeouts'], 0)
+
+    def test_exhausted_pool_times_out(self):
+        pool = self.make_pool(size=1, timeout=0.05)
+        pool.checkout(self.connect)
+        with self.assertRaises(pools.PoolExhausted):
+            pool.checkout(self.connect)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_expired_and_broken_connections_are_replaced(self):
+        pool = self.make_pool(max_lifetime=0.01, check_after=0)
+        raw, _ = pool.checkout(self.connect)
+        time.sleep(0.02)
+        pool.checkin(raw)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+        pool.max_lifetime = 60
+        raw, _ = pool.checkout(self.connect)
+        pool.checkin(raw)
+        raw.close()
+        fresh, reused = pool.checkout(self.connect)
+        self.assertFalse(reused)
+        self.assertIsNot(fresh, raw)
+        self.assertEqual(pool.stats()['health_checks'], 1)
+
+    def test_backend_returns_connection_to_pool(self):
+        settings_dict = dict(
+            connection.settings_dict, NAME=self.path,
+            ENGINE='core.db.backends.pooled_sqlite3'
+        )
+        wrapper = DatabaseWrapper(settings_dict, alias='pooled')
+        self.addCleanup(pools.close_all)
+        for _ in range(3):
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            wrapper.close()
+        self.assertTrue(wrapper.reused_connection)
+        stats = wrapper.pool.stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['checkouts'], 3)
+        self.assertEqual(stats['idle'], 1)
+
+        wrapper.connect()
+        wrapper.connection.execute('BEGIN')
+        wrapper.connection.execute('CREATE TABLE t (id INTEGER)')
+        wrapper.close()
+        with wrapper.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name = 't'"
+            )
+            self.assertEqual(cursor.fetchone()[0], 0)
+        wrapper.close()
+
+
+class PoolStatsViewTests(TestCase):
+    def test_stats_endpoint_is_staff_only(self):
+        url = reverse('core:pool_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(get_user_model().objects.create_user(
+            username='staff', is_staff=True
+        ))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), dict)
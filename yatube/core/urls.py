@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('stats/queries/', views.query_stats, name='query_stats'),
+    path('stats/pools/', views.pool_stats, name='pool_stats'),
+]
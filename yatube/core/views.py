@@ -1,5 +1,10 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import metrics
+from .db import pool
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,17 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def query_stats(request):
+    """Перцентили запросов и времени по представлениям (для staff)."""
+    return JsonResponse(
+        metrics.report(), json_dumps_params={'ensure_ascii': False}
+    )
+
+
+@staff_member_required
+def pool_stats(request):
+    """Счётчики пулов соединений с базой этого процесса (для staff)."""
+    return JsonResponse(pool.stats())
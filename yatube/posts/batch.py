@@ -0,0 +1,124 @@
+"""Пакетное создание постов и комментариев.
+
+Каждый элемент проверяется обычной формой (PostForm, CommentForm), а
+прошедшие проверку вставляются одним bulk_create в одной транзакции.
+bulk_create не посылает сигналов, поэтому то, что сигналы делают для
+одного объекта (счётчики, ленты, поиск, версии кэша), здесь делается
+один раз на пачку. Счётчики и версии в кэше меняются после коммита:
+иначе читатель мог бы сохранить под новой версией ещё старые данные.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from . import counts, search, timeline, versions
+from .forms import CommentForm, PostForm
+from .models import Comment, Post, Profile
+
+
+class Result:
+    """Итог по элементу пачки: созданный объект или ошибки формы."""
+
+    def __init__(self, obj=None, errors=None):
+        self.obj = obj
+        self.errors = errors
+
+    @property
+    def ok(self):
+        return self.errors is None
+
+
+def _validate(items, form_class):
+    results = []
+    for item in items:
+        form = form_class(item if isinstance(item, dict) else {})
+        if form.is_valid():
+            results.append(Result(form.save(commit=False)))
+        else:
+            results.append(Result(errors=form.errors.get_json_data()))
+    return results
+
+
+def _bulk_create(model, objs):
+    """bulk_create, после которого у объектов есть pk.
+
+    SQLite не возвращает id вставленных строк. В транзакции запись
+    держит блокировку базы, поэтому наши строки — последние по id и
+    идут подряд в порядке вставки.
+    """
+    model.objects.bulk_create(objs)
+    if objs and objs[0].pk is None:
+        ids = list(model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )[:len(objs)])
+        for obj, pk in zip(objs, reversed(ids)):
+            obj.pk = pk
+    return objs
+
+
+def create_posts(author, items):
+    """Создаёт посты автора из списка словарей полей PostForm."""
+    results = _validate(items, PostForm)
+    posts = [result.obj for result in results if result.ok]
+    for post in posts:
+        post.author = author
+    if not posts:
+        return results
+    with transaction.atomic():
+        _bulk_create(Post, posts)
+        Profile.objects.filter(user=author).update(
+            post_count=F('post_count') + len(posts)
+        )
+        timeline.fan_out_posts(posts)
+        search.index_new_posts(posts)
+    groups = Counter(post.group_id for post in posts if post.group_id)
+    keys = {versions.post_key(post.pk) for post in posts}
+    for post in posts:
+        keys.update(versions.post_feeds(post, post.group_id))
+
+    def update_cache():
+        counts.adjust(
+            [counts.ALL_POSTS, counts.author_feed(author.pk)], len(posts)
+        )
+        for group_id, number in groups.items():
+            counts.adjust([counts.group_feed(group_id)], number)
+        versions.bump(*keys)
+    transaction.on_commit(update_cache)
+    return results
+
+
+def create_comments(author, items):
+    """Создаёт комментарии автора; у каждого элемента есть поле post."""
+    post_ids = {
+        item.get('post') for item in items if isinstance(item, dict)
+    }
+    existing = set(Post.objects.filter(
+        pk__in=[pk for pk in post_ids if isinstance(pk, int)]
+    ).values_list('pk', flat=True))
+    results = _validate(items, CommentForm)
+    comments = []
+    for item, result in zip(items, results):
+        if not result.ok:
+            continue
+        if item.get('post') not in existing:
+            result.obj = None
+            result.errors = {'post': [
+                {'message': 'Пост не найден', 'code': 'invalid'}
+            ]}
+            continue
+        result.obj.author = author
+        result.obj.post_id = item['post']
+        comments.append(result.obj)
+    if not comments:
+        return results
+    per_post = Counter(comment.post_id for comment in comments)
+    with transaction.atomic():
+        _bulk_create(Comment, comments)
+        for post_id, number in per_post.items():
+            Post.objects.filter(pk=post_id).update(
+                comment_count=F('comment_count') + number
+            )
+    keys = [versions.post_key(post_id) for post_id in per_post]
+    transaction.on_commit(lambda: versions.bump(*keys))
+    return results
@@ -0,0 +1,409 @@
+"""Синтетические данные и нагрузочный прогон представлений posts.
+
+seed() создаёт пользователей, группы, посты, подписки и комментарии
+через mixer и Faker, поэтому срабатывают все сигналы (счётчики, ленты,
+поисковый индекс). Популярность авторов и постов распределена по
+степенному закону: немного авторов пишут и собирают подписчиков
+больше всех.
+
+run() гоняет сценарии через тестовый клиент Django, по HTTP (wsgiref
+в фоновом потоке) или прямо через WSGI-приложение в несколько потоков
+и считает перцентили задержки, число SQL-запросов (из заголовка
+Server-Timing) и запросы в секунду.
+"""
+import io
+import random
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import Mixer
+from PIL import Image
+
+from core.metrics import percentile
+
+from .models import Comment, Follow, Group, Post, User
+
+VIEWS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+    'post_create',
+)
+PERCENTILES = (50, 95, 99)
+USERNAME = 'bench{}'
+
+Result = namedtuple('Result', 'view status latency queries')
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def power_law_weights(count, alpha):
+    """Веса 1 / rank^alpha: первые элементы выбираются чаще всего."""
+    return [1 / (rank ** alpha) for rank in range(1, count + 1)]
+
+
+def _image_bytes(rng):
+    image = Image.new('RGB', (1200, 800), tuple(
+        rng.randrange(256) for _ in range(3)
+    ))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def seed(users=100, posts=1000, groups=5, comments=2000,
+         follows_per_user=10, image_fraction=0.1, alpha=1.2,
+         random_seed=42):
+    """Создаёт набор данных; одинаковый random_seed — одинаковые данные."""
+    rng = random.Random(random_seed)
+    # mixer заполняет остальные поля через random и общий генератор Faker.
+    random.seed(random_seed)
+    Faker.seed(random_seed)
+    mixer = Mixer(commit=True, locale='ru_RU')
+    fake = mixer.faker
+    authors = [
+        mixer.blend(User, username=USERNAME.format(num))
+        for num in range(users)
+    ]
+    group_list = [
+        mixer.blend(
+            Group, title=fake.catch_phrase()[:200],
+            slug=f'bench-{num}', description=fake.text()
+        )
+        for num in range(groups)
+    ]
+    weights = power_law_weights(users, alpha)
+    image = _image_bytes(rng)
+    post_list = []
+    for num in range(posts):
+        fields = {
+            'author': rng.choices(authors, weights)[0],
+            'text': fake.text(),
+            'group': rng.choice(group_list + [None]),
+        }
+        if rng.random() < image_fraction:
+            fields['image'] = SimpleUploadedFile(
+                f'bench{num}.jpg', image, 'image/jpeg'
+            )
+        else:
+            # Иначе mixer сам заполнит ImageField картинкой.
+            fields['image'] = ''
+        post_list.append(mixer.blend(Post, **fields))
+    for user in authors:
+        count = min(rng.randint(0, follows_per_user * 2), users - 1)
+        followed = set()
+        while len(followed) < count:
+            author = rng.choices(authors, weights)[0]
+            if author != user:
+                followed.add(author)
+        for author in followed:
+            Follow.objects.create(user=user, author=author)
+    post_weights = power_law_weights(len(post_list), alpha)
+    for _ in range(comments):
+        mixer.blend(
+            Comment, post=rng.choices(post_list, post_weights)[0],
+            author=rng.choice(authors), text=fake.sentence()
+        )
+    return {
+        'users': users, 'posts': posts, 'groups': groups,
+        'comments': comments, 'follows': Follow.objects.count(),
+        'images': sum(1 for post in post_list if post.image),
+    }
+
+
+class Target:
+    """Случайные адреса сценариев по существующим данным."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.usernames = list(
+            User.objects.filter(username__startswith='bench').values_list(
+                'username', flat=True
+            )
+        )
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.post_ids = list(Post.objects.values_list('pk', flat=True))
+
+    def request(self, view):
+        """(метод, путь, данные) для одного запроса к представлению."""
+        if view == 'index':
+            return 'get', reverse('posts:index'), {}
+        if view == 'group_posts':
+            return 'get', reverse(
+                'posts:group_posts', args=[self.rng.choice(self.slugs)]
+            ), {}
+        if view == 'profile':
+            return 'get', reverse(
+                'posts:profile', args=[self.rng.choice(self.usernames)]
+            ), {}
+        if view == 'post_detail':
+            return 'get', reverse(
+                'posts:post_detail', args=[self.rng.choice(self.post_ids)]
+            ), {}
+        if view == 'follow_index':
+            return 'get', reverse('posts:follow_index'), {}
+        if view == 'post_create':
+            return 'post', reverse('posts:post_create'), {
+                'text': f'Нагрузочный пост {self.rng.random()}'
+            }
+        raise ValueError(f'Неизвестное представление: {view}')
+
+
+class ClientDriver:
+    """Запросы через django.test.Client — без сети, в этом процессе."""
+
+    @classmethod
+    def start(cls):
+        pass
+
+    @classmethod
+    def stop(cls):
+        pass
+
+    def __init__(self, username):
+        self.client = Client()
+        self.client.force_login(User.objects.get(username=username))
+
+    def __call__(self, method, path, data):
+        response = getattr(self.client, method)(path, data)
+        return response.status_code, response.get('Server-Timing', '')
+
+    def close(self):
+        pass
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class HTTPDriver:
+    """Запросы по HTTP к WSGI-приложению в фоновом потоке."""
+
+    server = None
+
+    @classmethod
+    def start(cls):
+        cls.server = make_server(
+            '127.0.0.1', 0, get_wsgi_application(),
+            server_class=_ThreadingWSGIServer, handler_class=_QuietHandler
+        )
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def stop(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def __init__(self, username):
+        host, port = self.server.server_address[:2]
+        self.base = f'http://{host}:{port}'
+        client = Client()
+        client.force_login(User.objects.get(username=username))
+        self.session = requests.Session()
+        self.session.cookies.update({
+            name: cookie.value for name, cookie in client.cookies.items()
+        })
+        self.session.get(self.base + reverse('posts:post_create'))
+
+    def __call__(self, method, path, data):
+        headers = {'X-CSRFToken': self.session.cookies.get('csrftoken', '')}
+        response = self.session.request(
+            method, self.base + path, data=data or None,
+            headers=headers, allow_redirects=False
+        )
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+    def close(self):
+        self.session.close()
+
+
+class WSGIDriver:
+    """Запросы прямо к WSGI-приложению: полный цикл обработчика без сети."""
+
+    application = None
+
+    @classmethod
+    def start(cls):
+        cls.application = get_wsgi_application()
+
+    @classmethod
+    def stop(cls):
+        cls.application = None
+
+    def __init__(self, username):
+        client = Client()
+        client.force_login(User.objects.get(username=username))
+        self.cookies = {
+            name: cookie.value for name, cookie in client.cookies.items()
+        }
+        # Первый запрос выдаёт cookie csrftoken.
+        self('get', reverse('posts:post_create'), {})
+
+    def environ(self, method, path, body):
+        environ = {
+            'REQUEST_METHOD': method.upper(),
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': '127.0.0.1',
+            'SERVER_PORT': '80',
+            'REMOTE_ADDR': '127.0.0.1',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': '127.0.0.1',
+            'HTTP_COOKIE': '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items()
+            ),
+            'HTTP_X_CSRFTOKEN': self.cookies.get('csrftoken', ''),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if body:
+            environ['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+            environ['CONTENT_LENGTH'] = str(len(body))
+        return environ
+
+    def __call__(self, method, path, data):
+        body = urlencode(data).encode() if data else b''
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = headers
+
+        result = self.application(
+            self.environ(method, path, body), start_response
+        )
+        try:
+            for _ in result:
+                pass
+        finally:
+            result.close()
+        timing = ''
+        for name, value in response['headers']:
+            if name.lower() == 'set-cookie':
+                cookie = SimpleCookie(value)
+                self.cookies.update(
+                    {key: morsel.value for key, morsel in cookie.items()}
+                )
+            elif name.lower() == 'server-timing':
+                timing = value
+        return response['status'], timing
+
+    def close(self):
+        pass
+
+
+DRIVERS = {
+    'client': ClientDriver, 'http': HTTPDriver, 'wsgi': WSGIDriver,
+}
+
+
+def _worker(driver_class, username, views, count, random_seed):
+    rng = random.Random(random_seed)
+    target = Target(rng)
+    driver = driver_class(username)
+    results = []
+    try:
+        for _ in range(count):
+            view = rng.choice(views)
+            method, path, data = target.request(view)
+            started = time.perf_counter()
+            status, timing = driver(method, path, data)
+            latency = (time.perf_counter() - started) * 1000
+            match = QUERIES_RE.search(timing)
+            results.append(Result(
+                view, status, latency, int(match.group(1)) if match else None
+            ))
+    finally:
+        driver.close()
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+    return results
+
+
+def summarize(results, elapsed):
+    report = {}
+    for view in sorted({result.view for result in results}):
+        rows = [result for result in results if result.view == view]
+        latencies = [row.latency for row in rows]
+        queries = [row.queries for row in rows if row.queries is not None]
+        report[view] = {
+            'requests': len(rows),
+            'errors': sum(row.status >= 400 for row in rows),
+            'rps': round(len(rows) / elapsed, 2),
+            'latency_ms': {
+                f'p{pct}': round(percentile(latencies, pct), 2)
+                for pct in PERCENTILES
+            },
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 2),
+                'max': max(queries),
+            } if queries else None,
+        }
+    return {
+        'requests': len(results),
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(results) / elapsed, 2),
+        'views': report,
+    }
+
+
+def run(views=VIEWS, total=200, concurrency=4, mode='client',
+        random_seed=42):
+    """Прогоняет total запросов в concurrency потоков."""
+    driver_class = DRIVERS[mode]
+    usernames = list(
+        User.objects.filter(username__startswith='bench').order_by(
+            'pk'
+        ).values_list('username', flat=True)[:concurrency]
+    )
+    if not usernames:
+        raise ValueError('Нет данных: сначала выполните seed()')
+    driver_class.start()
+    shares = [total // concurrency] * concurrency
+    shares[0] += total % concurrency
+    started = time.perf_counter()
+    try:
+        if concurrency == 1:
+            results = _worker(
+                driver_class, usernames[0], views, total, random_seed
+            )
+        else:
+            with ThreadPoolExecutor(concurrency) as executor:
+                futures = [
+                    executor.submit(
+                        _worker, driver_class,
+                        usernames[num % len(usernames)], views, share,
+                        random_seed + num
+                    )
+                    for num, share in enumerate(shares)
+                ]
+                results = [
+                    row for future in futures for row in future.result()
+                ]
+    finally:
+        driver_class.stop()
+    return summarize(results, time.perf_counter() - started)
@@ -0,0 +1,160 @@
+"""Валидаторы ETag для условных GET-запросов к лентам и постам.
+
+ETag собирается из версий в кэше (posts.versions) и id пользователя,
+поэтому его вычисление не загружает ленту и не рендерит шаблон: при
+совпадении с If-None-Match представление сразу отвечает 304. Функции
+*_version дают ту же версию без учёта пользователя для posts.holes. Версии
+меняют сигналы, так что любой пост, комментарий, группа, автор или
+подписка, видимые на странице, меняют и её ETag.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import counts, versions, writebehind
+from .models import Group, User
+
+
+def _version(keys, *parts):
+    """Версии keys (одним запросом к кэшу) и parts одной строкой."""
+    found = versions.get_many(keys)
+    return ':'.join(
+        str(part) for part in (*(found[key] for key in keys), *parts)
+    )
+
+
+def _etag(request, version, keys=(), parts=()):
+    """Хэш id пользователя, версии страницы и личных версий keys и parts.
+
+    Нет версии страницы — нет и ETag.
+    """
+    if version is None:
+        return None
+    user_id = request.user.pk if request.user.is_authenticated else 0
+    personal = _version(keys, *parts) if keys or parts else ''
+    raw = f'{user_id}:{version}:{personal}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _feed_keys(feed):
+    return [versions.feed_key(versions.FEEDS), versions.feed_key(feed)]
+
+
+def _follows_keys(user):
+    if not user.is_authenticated:
+        return []
+    return [versions.follows_key(user.pk)]
+
+
+def group_key(slug):
+    return f'etag:group:{slug}'
+
+
+def author_key(username):
+    return f'etag:author:{username}'
+
+
+def post_author_key(post_id):
+    return f'etag:post_author:{post_id}'
+
+
+def _cached_id(key, queryset, field='pk'):
+    """id из кэша или одним запросом; сигналы стирают устаревшие ключи.
+
+    Нет объекта — None, тогда ETag не считается и представление
+    ответит 404 как обычно.
+    """
+    value = cache.get(key)
+    if value is None:
+        value = queryset.values_list(field, flat=True).first()
+        if value is not None:
+            cache.set(key, value, settings.VERSION_TIMEOUT)
+    return value
+
+
+def index_version(request):
+    return _version(_feed_keys(counts.ALL_POSTS))
+
+
+def index_etag(request):
+    return _etag(request, index_version(request))
+
+
+def group_version(request, slug):
+    group_id = _cached_id(group_key(slug), Group.objects.filter(slug=slug))
+    if group_id is None:
+        return None
+    return _version(_feed_keys(counts.group_feed(group_id)))
+
+
+def group_etag(request, slug):
+    return _etag(request, group_version(request, slug))
+
+
+def profile_version(request, username):
+    author_id = _cached_id(
+        author_key(username), User.objects.filter(username=username)
+    )
+    if author_id is None:
+        return None
+    # На странице счётчики подписчиков и подписок автора.
+    return _version(
+        _feed_keys(counts.author_feed(author_id))
+        + [versions.follows_key(author_id), versions.followers_key(author_id)]
+    )
+
+
+def profile_etag(request, username):
+    pending = 0
+    if request.user.is_authenticated and request.user.username == username:
+        pending = writebehind.last_pending(request.user, writebehind.POST)
+    return _etag(
+        request, profile_version(request, username),
+        _follows_keys(request.user), [pending],
+    )
+
+
+def remember_post_author(post):
+    cache.add(
+        post_author_key(post.pk), post.author_id, settings.VERSION_TIMEOUT
+    )
+
+
+def post_detail_version(request, post_id):
+    # Автор поста берётся только из кэша: страницу без версии отдаст само
+    # представление и запомнит автора, лишнего запроса к базе нет.
+    author_id = cache.get(post_author_key(post_id))
+    if author_id is None:
+        return None
+    # На странице число постов автора: нужна версия его ленты.
+    return _version(
+        [versions.post_key(post_id)]
+        + _feed_keys(counts.author_feed(author_id))
+    )
+
+
+def post_detail_etag(request, post_id):
+    return _etag(
+        request, post_detail_version(request, post_id),
+        parts=[writebehind.last_pending(request.user, writebehind.COMMENT)],
+    )
+
+
+def post_version(request, post_id):
+    """Версия данных поста вместе с именами автора и группы."""
+    return _version([
+        versions.post_key(post_id), versions.feed_key(versions.FEEDS)
+    ])
+
+
+def groups_version(request):
+    # Изменение или удаление группы меняет FEEDS.
+    return _version([versions.feed_key(versions.FEEDS)])
+
+
+def follow_etag(request):
+    # Лента подписок меняется с любым постом и с подписками пользователя.
+    return _etag(
+        request, index_version(request), _follows_keys(request.user)
+    )
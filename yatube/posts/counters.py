@@ -0,0 +1,65 @@
+"""Пересчёт денормализованных счётчиков постов и профилей.
+
+Сигналы поддерживают счётчики при обычной работе; пересчёт нужен
+после массовой загрузки (bulk_create и сырой SQL сигналов не шлют).
+reconcile() сначала находит разошедшиеся счётчики и правит только
+их таблицы.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, Profile, User
+
+
+def _total(queryset, field, outer='pk'):
+    """Число строк queryset, у которых field равно полю outer снаружи."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+# (модель, счётчик, выражение с точным значением).
+COUNTERS = (
+    (Post, 'comment_count', lambda: _total(Comment.objects, 'post')),
+    (Profile, 'post_count',
+     lambda: _total(Post.objects, 'author', outer='user')),
+    (Profile, 'follower_count',
+     lambda: _total(Follow.objects, 'author', outer='user')),
+    (Profile, 'following_count',
+     lambda: _total(Follow.objects, 'user', outer='user')),
+)
+
+
+def _create_missing_profiles():
+    Profile.objects.bulk_create(
+        [
+            Profile(user_id=user_id)
+            for user_id in User.objects.filter(
+                profile__isnull=True
+            ).values_list('pk', flat=True).iterator()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild():
+    """Пересчитывает все счётчики COUNTERS."""
+    _create_missing_profiles()
+    for model, field, actual in COUNTERS:
+        model.objects.update(**{field: actual()})
+
+
+def reconcile():
+    """Исправляет разошедшиеся счётчики; возвращает их число по полям."""
+    _create_missing_profiles()
+    drifted = {}
+    for model, field, actual in COUNTERS:
+        count = model.objects.annotate(actual=actual()).exclude(
+            **{field: F('actual')}
+        ).count()
+        if count:
+            model.objects.update(**{field: actual()})
+        drifted[f'{model._meta.model_name}.{field}'] = count
+    return drifted
@@ -0,0 +1,101 @@
+"""Счётчики записей в лентах для пагинатора.
+
+Число постов в каждой ленте (все посты, группа, автор, подписки
+пользователя) хранится в кэше, поэтому виджет страниц не делает
+SELECT COUNT(*) на каждый запрос. Счётчики всех постов, групп и
+авторов поправляются сигналами. Счётчик ленты подписок при публикации
+не трогается — иначе пост автора с миллионом подписчиков стоил бы
+миллиона запросов к кэшу; он живёт FOLLOW_FEED_COUNT_TIMEOUT, а
+расхождение до того исправляет CachedCountPaginator.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+ALL_POSTS = 'all'
+KEY_TEMPLATE = 'feed_count:{}'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def follow_feed(user_id):
+    return f'follow:{user_id}'
+
+
+def _key(feed):
+    return KEY_TEMPLATE.format(feed)
+
+
+def _timeout(feed):
+    if feed.startswith(follow_feed('')):
+        return settings.FOLLOW_FEED_COUNT_TIMEOUT
+    return settings.FEED_COUNT_TIMEOUT
+
+
+def approximate_count(queryset):
+    """Оценка числа строк таблицы по статистике СУБД.
+
+    Подходит только для ленты без фильтров. Если статистики нет,
+    считает точно.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    row = None
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s', [table]
+            )
+            row = cursor.fetchone()
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone():
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+                )
+                stat = cursor.fetchone()
+                row = stat and (stat[0].split()[0],)
+    if row and row[0] is not None and int(float(row[0])) > 0:
+        return int(float(row[0]))
+    return queryset.count()
+
+
+def peek(feed):
+    """Закэшированное число записей ленты или None."""
+    return cache.get(_key(feed))
+
+
+def get_count(feed, queryset):
+    count = cache.get(_key(feed))
+    if count is None:
+        if feed == ALL_POSTS:
+            count = approximate_count(queryset)
+        else:
+            count = queryset.count()
+        cache.add(_key(feed), count, _timeout(feed))
+    return count
+
+
+def set_count(feed, count):
+    cache.set(_key(feed), count, _timeout(feed))
+
+
+def adjust(feeds, delta):
+    """Сдвигает счётчики, которые уже есть в кэше."""
+    for feed in feeds:
+        try:
+            cache.incr(_key(feed), delta)
+        except ValueError:
+            pass
+
+
+def invalidate(feeds):
+    cache.delete_many([_key(feed) for feed in feeds])
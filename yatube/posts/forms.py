@@ -1,5 +1,5 @@
 from django import forms
-from . models import Post, Comment
+from . models import Post, Comment, Group
 
 
 class PostForm(forms.ModelForm):
@@ -12,3 +12,12 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200)
+    group = forms.ModelChoiceField(
+        Group.objects.all(), label='Группа', required=False,
+        to_field_name='slug'
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
@@ -0,0 +1,146 @@
+"""Граф подписок в кэше.
+
+Для каждого пользователя в кэше лежат два отсортированных массива
+array('I') с id: на кого он подписан и кто подписан на него. Массив
+хранится как bytes (4 байта на id), поэтому даже у автора с тысячами
+подписчиков это одна небольшая запись кэша. Проверка подписки —
+бинарный поиск, число подписок — длина массива, пересечения считаются
+слиянием отсортированных массивов.
+
+Сигналы Follow правят массивы на месте, если они уже в кэше. Правка —
+чтение и запись без блокировки, поэтому у ключей конечный срок
+FOLLOW_GRAPH_TIMEOUT: редкая потерянная при гонке правка исчезнет
+вместе с ключом.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+
+_COLUMNS = {
+    # Сторона графа: (поле-владелец, поле-сосед).
+    FOLLOWING: ('user_id', 'author_id'),
+    FOLLOWERS: ('author_id', 'user_id'),
+}
+
+
+def _key(side, user_id):
+    return f'graph:{side}:{user_id}'
+
+
+def _unpack(raw):
+    ids = array('I')
+    ids.frombytes(raw)
+    return ids
+
+
+def _load(side, user_id):
+    owner, other = _COLUMNS[side]
+    ids = array('I', Follow.objects.filter(
+        **{owner: user_id}
+    ).order_by(other).values_list(other, flat=True))
+    cache.set(
+        _key(side, user_id), ids.tobytes(), settings.FOLLOW_GRAPH_TIMEOUT
+    )
+    return ids
+
+
+def _get(side, user_id):
+    raw = cache.get(_key(side, user_id))
+    if raw is None:
+        return _load(side, user_id)
+    return _unpack(raw)
+
+
+def following(user_id):
+    """Отсортированный array('I') id авторов, на которых подписан user."""
+    if user_id is None:
+        return array('I')
+    return _get(FOLLOWING, user_id)
+
+
+def followers(user_id):
+    """Отсортированный array('I') id подписчиков пользователя."""
+    return _get(FOLLOWERS, user_id)
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def is_following(user_id, author_id):
+    if user_id is None:
+        return False
+    return _contains(following(user_id), author_id)
+
+
+def following_count(user_id):
+    return len(following(user_id))
+
+
+def follower_count(user_id):
+    return len(followers(user_id))
+
+
+def intersect(first, second):
+    """Общие id двух отсортированных массивов слиянием."""
+    result = array('I')
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i] == second[j]:
+            result.append(first[i])
+            i += 1
+            j += 1
+        elif first[i] < second[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def followed_by_following(user_id, author_id):
+    """Кто из тех, на кого подписан user, подписан на author."""
+    if user_id is None:
+        return array('I')
+    return intersect(following(user_id), followers(author_id))
+
+
+def _update(side, owner_id, other_id, add):
+    key = _key(side, owner_id)
+    raw = cache.get(key)
+    if raw is None:
+        return
+    ids = _unpack(raw)
+    index = bisect_left(ids, other_id)
+    present = index < len(ids) and ids[index] == other_id
+    if add and not present:
+        ids.insert(index, other_id)
+    elif not add and present:
+        del ids[index]
+    else:
+        return
+    cache.set(key, ids.tobytes(), settings.FOLLOW_GRAPH_TIMEOUT)
+
+
+def add(user_id, author_id):
+    _update(FOLLOWING, user_id, author_id, True)
+    _update(FOLLOWERS, author_id, user_id, True)
+
+
+def remove(user_id, author_id):
+    _update(FOLLOWING, user_id, author_id, False)
+    _update(FOLLOWERS, author_id, user_id, False)
+
+
+def forget(*user_ids):
+    """Стирает массивы пользователей (массовые изменения в обход сигналов)."""
+    cache.delete_many([
+        _key(side, user_id) for user_id in user_ids for side in _COLUMNS
+    ])
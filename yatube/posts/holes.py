@@ -0,0 +1,142 @@
+"""Полностраничный кэш с «дырками» под части страницы пользователя.
+
+Страница кэшируется как оболочка: всё, что зависит от пользователя
+(шапка, кнопка подписки, форма комментария, посты в очереди), выведено
+тегом {% hole %} в отдельные шаблоны. При рендере оболочки тег
+оставляет вместо них метку, а при каждой выдаче метки заменяются
+шаблоном, отрендеренным для текущего запроса. Анонимам отдаётся
+готовая заполненная страница без рендера вовсе.
+
+Ключ оболочки — путь, строка запроса и версии объектов страницы
+(posts.conditional), поэтому изменение поста, комментария, группы или
+автора меняет ключ и старая оболочка больше не находится.
+"""
+import base64
+import functools
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from . import graph, writebehind
+from .forms import CommentForm
+
+HOLE_RE = re.compile(r'<!--hole:([A-Za-z0-9_=-]+)-->')
+
+_builders = {}
+
+
+def builder(template_name):
+    """Регистрирует функцию контекста для шаблона дырки.
+
+    Функция получает запрос и параметры тега и возвращает словарь,
+    который добавляется к параметрам в контексте шаблона.
+    """
+    def register(func):
+        _builders[template_name] = func
+        return func
+    return register
+
+
+def placeholder(template_name, params):
+    raw = json.dumps([template_name, params], separators=(',', ':'))
+    return f'<!--hole:{base64.urlsafe_b64encode(raw.encode()).decode()}-->'
+
+
+def render(request, template_name, params):
+    context = dict(params)
+    build = _builders.get(template_name)
+    if build is not None:
+        context.update(build(request, **params))
+    return render_to_string(template_name, context, request=request)
+
+
+def fill(request, shell):
+    def replace(match):
+        template_name, params = json.loads(
+            base64.urlsafe_b64decode(match.group(1)).decode()
+        )
+        return render(request, template_name, params)
+    return HOLE_RE.sub(replace, shell)
+
+
+def _key(kind, request, version):
+    raw = f'{request.get_full_path()}:{version}'
+    return f'page:{kind}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def page_cache(version_func):
+    """Кэширует оболочку страницы, пока не изменится version_func.
+
+    version_func(request, *args, **kwargs) возвращает версию страницы
+    без учёта пользователя или None, если её не узнать без лишних
+    запросов — тогда страница рендерится как обычно.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.PAGE_CACHE_ENABLED or request.method not in (
+                'GET', 'HEAD'
+            ):
+                return view(request, *args, **kwargs)
+            version = version_func(request, *args, **kwargs)
+            if version is None:
+                return view(request, *args, **kwargs)
+            anonymous = not request.user.is_authenticated
+            page_key = _key('anonymous', request, version)
+            if anonymous:
+                page = cache.get(page_key)
+                if page is not None:
+                    return HttpResponse(page)
+            shell_key = _key('shell', request, version)
+            shell = cache.get(shell_key)
+            if shell is None:
+                request.page_shell = True
+                response = view(request, *args, **kwargs)
+                request.page_shell = False
+                if response.status_code != 200 or response.streaming:
+                    return response
+                shell = response.content.decode(response.charset)
+                cache.set(shell_key, shell, settings.PAGE_CACHE_TIMEOUT)
+            else:
+                response = HttpResponse()
+            page = fill(request, shell)
+            if anonymous:
+                cache.set(page_key, page, settings.PAGE_CACHE_TIMEOUT)
+            response.content = page
+            return response
+        return wrapper
+    return decorator
+
+
+@builder('posts/includes/follow_button.html')
+def follow_button(request, username, author_id):
+    return {
+        'following': graph.is_following(request.user.pk, author_id),
+        'followed_by': len(
+            graph.followed_by_following(request.user.pk, author_id)
+        ),
+    }
+
+
+@builder('posts/includes/comment_form.html')
+def comment_form(request, post_id):
+    return {'form': CommentForm()}
+
+
+@builder('posts/includes/pending_comments.html')
+def pending_comments(request, post_id):
+    return {
+        'pending_comments': writebehind.pending_comments(post_id, request.user)
+    }
+
+
+@builder('posts/includes/pending_posts.html')
+def pending_posts(request, username):
+    if request.user.is_authenticated and request.user.username == username:
+        return {'pending_posts': writebehind.pending_posts(request.user)}
+    return {'pending_posts': []}
@@ -0,0 +1,91 @@
+import json
+import subprocess
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон представлений posts с отчётом в JSON. '
+        'Запускайте на отдельной базе: --seed создаёт данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Перед прогоном создать синтетические данные.'
+        )
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Среднее число подписок пользователя.')
+        parser.add_argument('--images', type=float, default=0.1,
+                            help='Доля постов с картинкой.')
+        parser.add_argument('--alpha', type=float, default=1.2,
+                            help='Показатель степенного закона.')
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--mode', choices=sorted(benchmark.DRIVERS), default='client'
+        )
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            choices=benchmark.VIEWS,
+            help='Представление для прогона; по умолчанию все.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для JSON-отчёта; иначе stdout.'
+        )
+
+    def _revision(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True
+            ).stdout.strip() or None
+        except OSError:
+            return None
+
+    def handle(self, *args, **options):
+        report = {
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'revision': self._revision(),
+            'options': {
+                key: options[key] for key in (
+                    'requests', 'concurrency', 'mode', 'random_seed'
+                )
+            },
+        }
+        if options['seed']:
+            report['dataset'] = benchmark.seed(
+                users=options['users'], posts=options['posts'],
+                groups=options['groups'], comments=options['comments'],
+                follows_per_user=options['follows'],
+                image_fraction=options['images'], alpha=options['alpha'],
+                random_seed=options['random_seed'],
+            )
+        run_options = {
+            'views': options['views'] or benchmark.VIEWS,
+            'total': options['requests'],
+            'concurrency': options['concurrency'],
+            'random_seed': options['random_seed'],
+        }
+        report['results'] = benchmark.run(
+            mode=options['mode'], **run_options
+        )
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчёт записан в {options["output"]}'
+            ))
+        else:
+            self.stdout.write(output)
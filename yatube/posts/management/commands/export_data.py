@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает пользователей, группы, посты, комментарии '
+        'и подписки в каталог: по файлу на модель в NDJSON или CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='ndjson')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Сжимать файлы (суффикс .gz).')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Строк на одну выборку из базы.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        totals = transfer.export(
+            options['directory'], options['format'], options['gzip'],
+            options['chunk_size'],
+        )
+        for name, count in totals.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import counters, search, seeding, timeline, transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_data: пакетами через bulk_create, '
+        'с пересчётом внешних ключей. Прерванную загрузку можно '
+        'продолжить тем же вызовом. Файлы картинок копируются отдельно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--state',
+            help='Файл состояния загрузки; по умолчанию '
+                 '<каталог>/.import-state.sqlite3.'
+        )
+        parser.add_argument('--restart', action='store_true',
+                            help='Забыть прогресс и начать заново.')
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики и поисковый индекс.'
+        )
+
+    def _progress(self, name, rows):
+        self.stdout.write(f'{name}: {rows} строк', ending='\r')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        importer = transfer.Importer(
+            options['directory'], options['state'], options['batch_size'],
+            restart=options['restart'],
+        )
+        totals = importer.run(self._progress)
+        for name, count in totals.items():
+            self.stdout.write(f'{name}: {count} строк')
+        seeding.reset_sequences()
+        if not options['skip_rebuild']:
+            counters.rebuild()
+            search.rebuild()
+            seeding.forget_cache()
+        if timeline.enabled():
+            self.stdout.write(self.style.WARNING(
+                'Ленты подписок не обновлены: выполните rebuild_timelines.'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'
+        ))
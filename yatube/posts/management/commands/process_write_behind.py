@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import writebehind
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты и комментарии из журнала WRITE_BEHIND в базу '
+        'пачками, по транзакции на пачку. Запускайте один экземпляр.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--interval', type=float, default=0.5,
+                            help='Пауза в секундах, когда журнал пуст.')
+        parser.add_argument('--once', action='store_true',
+                            help='Разобрать журнал и выйти.')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                taken, created = writebehind.drain(options['batch_size'])
+                total += created
+                if taken:
+                    self.stdout.write(
+                        f'Записано {created} из {taken}, '
+                        f'в очереди {writebehind.backlog()}'
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Всего записано: {total}'))
+        failed = writebehind.failed()
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'Не удалось применить записей: {failed}'
+            ))
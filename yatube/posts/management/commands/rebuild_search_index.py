@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс постов.'
+
+    def handle(self, *args, **options):
+        total = search.rebuild()
+        backend = 'FTS5' if search.uses_fts() else 'SearchTerm'
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано постов ({backend}): {total}')
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает materialized-ленты подписок (FeedEntry).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя, чью ленту нужно пересобрать; '
+                 'можно указать несколько раз.'
+        )
+
+    def handle(self, *args, **options):
+        total = timeline.rebuild(options['user_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Записей в лентах: {total}')
+        )
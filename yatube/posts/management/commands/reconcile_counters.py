@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет денормализованные счётчики (комментарии, посты, '
+        'подписчики, подписки) с данными и исправляет расхождения.'
+    )
+
+    def handle(self, *args, **options):
+        drifted = counters.reconcile()
+        for counter, count in drifted.items():
+            self.stdout.write(f'{counter}: расхождений {count}')
+        if any(drifted.values()):
+            # Счётчики видны в закэшированных фрагментах и страницах.
+            cache.clear()
+            self.stdout.write(self.style.WARNING('Счётчики исправлены'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
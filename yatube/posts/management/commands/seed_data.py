@@ -0,0 +1,118 @@
+import os
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import counters, search, seeding, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+STAGES = (
+    ('user', User, 'users', seeding.generate),
+    ('group', Group, 'groups', seeding.generate),
+    ('post', Post, 'posts', seeding.generate),
+    ('comment', Comment, 'comments', seeding.generate),
+    ('follow', Follow, 'users', seeding.generate_follows),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро загружает большой синтетический набор пользователей, '
+        'групп, постов, комментариев и подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок пользователя.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней растянуть даты постов.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=20000)
+        parser.add_argument('--workers', type=int,
+                            default=os.cpu_count() or 1)
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики и поисковый индекс.'
+        )
+        parser.add_argument(
+            '--timelines', action='store_true',
+            help='Разложить посты по лентам подписок (FeedEntry). '
+                 'Записей столько, сколько постов у всех авторов всех '
+                 'подписок, поэтому по умолчанию выключено.'
+        )
+
+    def _load(self, stage, pool, spec, options):
+        name, model, total_option, generate = stage
+        total = options[total_option]
+        if name == 'follow' and total < 2:
+            return
+        tasks = seeding.tasks(name, total, options['chunk_size'], spec)
+        if pool is None:
+            chunks = map(generate, tasks)
+        else:
+            chunks = pool.imap(generate, tasks)
+        started = time.monotonic()
+        rows = 0
+        with seeding.deferred_indexes(model):
+            for chunk in chunks:
+                seeding.insert(model, chunk)
+                rows += len(chunk)
+                rate = rows / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(
+                    f'{name}: {rows} строк, {rate:.0f} в секунду',
+                    ending='\r'
+                )
+        self.stdout.write(
+            f'{name}: {rows} строк за {time.monotonic() - started:.1f} с'
+        )
+
+    def _rebuild(self, timelines):
+        steps = [
+            ('Счётчики', counters.rebuild),
+            ('Поисковый индекс', search.rebuild),
+        ]
+        if timelines:
+            steps.append(('Ленты подписок', timeline.rebuild))
+        for title, rebuild in steps:
+            started = time.monotonic()
+            rebuild()
+            self.stdout.write(f'{title}: {time.monotonic() - started:.1f} с')
+        seeding.forget_cache()
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        spec = seeding.make_spec(
+            options['users'], options['groups'], options['posts'],
+            options['comments'], options['follows'], options['days'],
+            options['seed'],
+        )
+        pool = None
+        if options['workers'] > 1:
+            # Дочерние процессы не пишут в базу и не должны делить
+            # с родителем открытое соединение.
+            connections.close_all()
+            pool = Pool(options['workers'])
+        try:
+            for stage in STAGES:
+                self._load(stage, pool, spec, options)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        seeding.reset_sequences()
+        if not options['skip_rebuild']:
+            self._rebuild(options['timelines'])
+        if not options['timelines'] and timeline.enabled():
+            self.stdout.write(self.style.WARNING(
+                'Ленты подписок не заполнены: выполните rebuild_timelines '
+                'или выключите FEED_FANOUT_ENABLED.'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,123 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _warm(name):
+    try:
+        return sum(
+            thumbnail is not None
+            for thumbnail in thumbnails.generate_all(name)
+        )
+    except Exception:
+        return -1
+
+
+class Command(BaseCommand):
+    help = (
+        'Заранее создаёт миниатюры всех картинок постов и удаляет '
+        'миниатюры, оставшиеся без картинки или поста.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов; 1 — работать в текущем процессе.'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=200,
+            help='Сколько картинок обрабатывать между сохранениями '
+                 'прогресса.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.MEDIA_ROOT, '.warm_thumbnails'),
+            help='Файл с id последнего обработанного поста.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не читая сохранённый прогресс.'
+        )
+        parser.add_argument(
+            '--cleanup', action='store_true',
+            help='После прогрева удалить осиротевшие миниатюры.'
+        )
+
+    def _read_checkpoint(self, path, restart):
+        if restart or not os.path.exists(path):
+            return 0
+        with open(path) as checkpoint:
+            return int(checkpoint.read().strip() or 0)
+
+    def _write_checkpoint(self, path, last_pk):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(f'{path}.tmp', 'w') as checkpoint:
+            checkpoint.write(str(last_pk))
+        os.replace(f'{path}.tmp', path)
+
+    def _batches(self, images, last_pk, size, path, executor):
+        """Отдаёт результаты пачками и сохраняет прогресс после каждой."""
+        while True:
+            batch = list(images.filter(pk__gt=last_pk)[:size])
+            if not batch:
+                return
+            names = [name for _, name in batch]
+            if executor is None:
+                yield list(map(_warm, names))
+            else:
+                yield list(executor.map(_warm, names))
+            last_pk = batch[-1][0]
+            self._write_checkpoint(path, last_pk)
+
+    def handle(self, *args, **options):
+        path = options['checkpoint']
+        last_pk = self._read_checkpoint(path, options['restart'])
+        if last_pk:
+            self.stdout.write(f'Продолжаю после поста {last_pk}')
+        images = Post.objects.exclude(image='').order_by('pk').values_list(
+            'pk', 'image'
+        )
+        total = images.filter(pk__gt=last_pk).count()
+        done = created = failed = 0
+        started = time.monotonic()
+        executor = None
+        if options['workers'] > 1:
+            # Дочерние процессы не должны делить соединение с родителем.
+            connections.close_all()
+            executor = ProcessPoolExecutor(options['workers'])
+        try:
+            for results in self._batches(
+                images, last_pk, options['batch'], path, executor
+            ):
+                failed += sum(result < 0 for result in results)
+                created += sum(result for result in results if result > 0)
+                done += len(results)
+                self.stdout.write(
+                    f'{done}/{total} картинок, '
+                    f'{done / (time.monotonic() - started):.1f} в секунду'
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        if os.path.exists(path):
+            os.remove(path)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {done}, миниатюр: {created}, ошибок: {failed}, '
+            f'{elapsed:.1f} с ({done / elapsed if elapsed else 0:.1f} '
+            f'картинок в секунду)'
+        ))
+        if options['cleanup']:
+            removed = thumbnails.cleanup_orphans(
+                images.values_list('image', flat=True)
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено осиротевших миниатюр: {removed}'
+            ))
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_follow_counters(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('posts', 'Profile')
+    for field, column in (
+        ('follower_count', 'author'), ('following_count', 'user')
+    ):
+        follows = Follow.objects.filter(
+            **{column: OuterRef('user')}
+        ).order_by().values(column).annotate(
+            total=Count('pk')).values('total')
+        Profile.objects.update(**{field: Coalesce(Subquery(follows), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_follow_counters, migrations.RunPython.noop),
+    ]
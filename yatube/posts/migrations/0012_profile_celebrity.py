@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.filter(
+        follower_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).update(celebrity=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_follow_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='celebrity',
+            field=models.BooleanField(default=False, db_index=True),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
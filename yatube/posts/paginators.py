@@ -1,13 +1,281 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import counts
+
+CURSOR_AFTER = 'a'
+CURSOR_BEFORE = 'b'
+
+
+def encode_cursor(direction, values):
+    if values is not None:
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in values
+        ]
+    raw = json.dumps([direction, values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, значения ключа) или None для мусора."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        return None
+    if direction not in (CURSOR_AFTER, CURSOR_BEFORE):
+        return None
+    if values is not None and not isinstance(values, list):
+        return None
+    return direction, values
+
+
+# Курсор без ключа с направлением «назад» открывает последнюю страницу.
+LAST_PAGE_CURSOR = encode_cursor(CURSOR_BEFORE, None)
+
+
+class KeysetPage:
+    """Страница keyset-пагинации с интерфейсом, похожим на Page."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<KeysetPage>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1], CURSOR_AFTER)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.cursor_for(self.object_list[0], CURSOR_BEFORE)
+
+
+class KeysetPaginator:
+    """Пагинация по ключу (seek method) вместо OFFSET.
+
+    Страница выбирается условием на ключ сортировки, поэтому стоимость
+    запроса не зависит от глубины страницы и COUNT(*) не нужен.
+    `keys` — поля ключа, последним должно идти уникальное поле.
+    """
+
+    def __init__(self, queryset, per_page, keys=('pub_date', 'pk'),
+                 descending=True):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.keys = tuple(keys)
+        self.descending = descending
+
+    def _field(self, key):
+        annotation = self.queryset.query.annotations.get(key)
+        if annotation is not None:
+            return annotation.output_field
+        opts = self.queryset.model._meta
+        return opts.pk if key == 'pk' else opts.get_field(key)
+
+    def _ordering(self, reverse=False):
+        prefix = '-' if self.descending != reverse else ''
+        return [prefix + key for key in self.keys]
+
+    def _seek(self, values, reverse=False):
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        condition = Q()
+        for index, key in enumerate(self.keys):
+            step = Q(**{f'{key}__{lookup}': values[index]})
+            for prev_key, prev_value in zip(self.keys, values[:index]):
+                step &= Q(**{prev_key: prev_value})
+            condition |= step
+        return condition
+
+    def _key_values(self, obj):
+        if isinstance(obj, dict):
+            return [obj[key] for key in self.keys]
+        return [getattr(obj, key) for key in self.keys]
+
+    def _parse_values(self, values):
+        if values is None:
+            return None
+        if len(values) != len(self.keys):
+            raise ValidationError('Неверный курсор')
+        return [
+            self._field(key).to_python(value)
+            for key, value in zip(self.keys, values)
+        ]
+
+    def cursor_for(self, obj, direction):
+        return encode_cursor(direction, self._key_values(obj))
+
+    def first_page(self):
+        return self.get_page(None)
+
+    def get_page(self, cursor):
+        decoded = decode_cursor(cursor) if cursor else None
+        direction, values = decoded or (CURSOR_AFTER, None)
+        try:
+            values = self._parse_values(values)
+        except ValidationError:
+            direction, values = CURSOR_AFTER, None
+        backwards = direction == CURSOR_BEFORE
+        queryset = self.queryset.order_by(*self._ordering(backwards))
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+        object_list = list(queryset[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if backwards:
+            object_list.reverse()
+            return KeysetPage(
+                object_list, self,
+                has_next=values is not None, has_previous=has_more
+            )
+        return KeysetPage(
+            object_list, self,
+            has_next=has_more, has_previous=values is not None
+        )
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт число записей ленты из кэша.
+
+    Закэшированное число может устареть (bulk_create, откат транзакции),
+    поэтому страница выбирается с одной лишней строкой: по ней видно,
+    сходится ли счётчик с данными. Последняя страница даёт точное число
+    бесплатно, а явное расхождение приводит к одному точному COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, feed, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.feed = feed
+        self._exact = False
+
+    @cached_property
+    def count(self):
+        count = counts.peek(self.feed)
+        if count is None:
+            count = counts.get_count(self.feed, self.object_list)
+            # Только что посчитанное число точное (кроме оценки для всех
+            # постов), второй COUNT(*) на промахе не нужен.
+            self._exact = self.feed != counts.ALL_POSTS
+        return count
+
+    def _recount(self, count=None):
+        if count is None:
+            count = self.object_list.count()
+        counts.set_count(self.feed, count)
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+        self._exact = True
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self._exact:
+                raise
+            self._recount()
+            return super().validate_number(number)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            return super().get_page(self.num_pages)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        if len(object_list) > self.per_page:
+            if self.count <= bottom + self.per_page:
+                self._recount()
+        elif object_list or number == 1:
+            if self.count != bottom + len(object_list):
+                self._recount(bottom + len(object_list))
+        elif not self._exact:
+            self._recount()
+            return self.page(number)
+        else:
+            raise EmptyPage('That page contains no results')
+        return self._get_page(object_list[:self.per_page], number, self)
+
 
+def paginate_page(request, queryset, feed=None, keys=('pub_date', 'pk')):
+    """Пагинация ленты постов.
 
-def paginate_page(request, queryset):
-    paginator = Paginator(queryset, settings.POST_LIMIT)
+    Первые PAGE_NUMBER_LIMIT страниц доступны по номеру (?page=N),
+    дальше лента листается курсором (?cursor=...), который не требует
+    ни OFFSET, ни подсчёта всех записей. Если передан ключ ленты `feed`,
+    число записей для виджета страниц берётся из кэша счётчиков.
+    `keys` — ключ сортировки ленты для курсора. PAGE_NUMBER_LIMIT
+    ограничивает только ссылки виджета: старые ссылки ?page=N дальше
+    него открывают ту же страницу N.
+    """
+    cursor = request.GET.get('cursor')
     page_number = request.GET.get('page')
+    if cursor:
+        keyset = KeysetPaginator(queryset, settings.POST_LIMIT, keys)
+        page_obj = keyset.get_page(cursor)
+        return {
+            'paginator': None,
+            'page_number': None,
+            'page_obj': page_obj,
+            'next_cursor': page_obj.next_cursor,
+            'previous_cursor': page_obj.previous_cursor,
+            'last_cursor': LAST_PAGE_CURSOR,
+        }
+    if feed is None:
+        paginator = Paginator(queryset, settings.POST_LIMIT)
+    else:
+        paginator = CachedCountPaginator(queryset, settings.POST_LIMIT, feed)
     page_obj = paginator.get_page(page_number)
+    next_cursor = None
+    if page_obj.has_next() and len(page_obj):
+        next_cursor = KeysetPaginator(
+            queryset, settings.POST_LIMIT, keys
+        ).cursor_for(page_obj[-1], CURSOR_AFTER)
     return {
         'paginator': paginator,
         'page_number': page_number,
         'page_obj': page_obj,
+        'page_range': range(
+            1, min(paginator.num_pages, settings.PAGE_NUMBER_LIMIT) + 1
+        ),
+        'next_cursor': next_cursor,
+        'last_cursor': LAST_PAGE_CURSOR,
     }
@@ -0,0 +1,180 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite индекс хранится в виртуальной таблице FTS5 posts_post_fts
+(rowid = id поста) и ранжируется bm25. На других базах, или если
+SEARCH_BACKEND = 'python', используется обратный индекс в модели
+SearchTerm: текст разбивается на слова в Python, а ранг считается
+как сумма tf * idf по словам запроса.
+Индекс обновляется сигналами при сохранении и удалении поста.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import (Case, Count, ExpressionWrapper, F, FloatField,
+                              Sum, Value, When)
+from django.db.models.expressions import RawSQL
+
+from . import counts
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+TERM_LENGTH = 64
+# Больше слов в запросе не учитываем: каждое — отдельное условие.
+MAX_QUERY_TERMS = 8
+BATCH_SIZE = 1000
+
+TOKEN_RE = re.compile(r'\w+')
+
+_fts_table_exists = None
+
+
+def tokenize(text):
+    return [token[:TERM_LENGTH] for token in TOKEN_RE.findall(text.casefold())]
+
+
+def uses_fts():
+    """FTS5 доступен, если миграция смогла создать таблицу индекса."""
+    global _fts_table_exists
+    if settings.SEARCH_BACKEND == 'python' or connection.vendor != 'sqlite':
+        return False
+    if _fts_table_exists is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = %s", [FTS_TABLE]
+            )
+            _fts_table_exists = cursor.fetchone() is not None
+    return _fts_table_exists
+
+
+def _term_rows(post_id, text):
+    return [
+        SearchTerm(post_id=post_id, term=term, frequency=frequency)
+        for term, frequency in Counter(tokenize(text)).items()
+    ]
+
+
+def index_post(post):
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+        return
+    SearchTerm.objects.filter(post_id=post.pk).delete()
+    SearchTerm.objects.bulk_create(_term_rows(post.pk, post.text))
+
+
+def index_new_posts(posts):
+    """Индексирует пачку только что созданных постов."""
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [(post.pk, post.text) for post in posts]
+            )
+        return
+    SearchTerm.objects.bulk_create(
+        [row for post in posts for row in _term_rows(post.pk, post.text)],
+        batch_size=BATCH_SIZE
+    )
+
+
+def remove_post(post_id):
+    # Строки SearchTerm удаляет каскад внешнего ключа.
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+
+def rebuild():
+    """Пересобирает индекс целиком; возвращает число постов."""
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+        return Post.objects.count()
+    SearchTerm.objects.all().delete()
+    total = 0
+    rows = []
+    posts = Post.objects.order_by().values_list('pk', 'text')
+    for post_id, text in posts.iterator(chunk_size=BATCH_SIZE):
+        rows += _term_rows(post_id, text)
+        total += 1
+        if len(rows) >= BATCH_SIZE:
+            SearchTerm.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            rows = []
+    SearchTerm.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return total
+
+
+def _fts_search(terms):
+    match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+    return Post.objects.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {Post._meta.db_table}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match],
+    ).annotate(
+        # rank в FTS5 — bm25 со знаком минус: чем меньше, тем лучше.
+        score=RawSQL(f'-{FTS_TABLE}.rank', (), output_field=FloatField())
+    )
+
+
+def _nothing():
+    return Post.objects.none().annotate(
+        score=Value(0.0, output_field=FloatField())
+    )
+
+
+def _python_search(terms):
+    frequencies = dict(
+        SearchTerm.objects.filter(term__in=terms).values_list(
+            'term'
+        ).annotate(Count('pk')).order_by()
+    )
+    if len(frequencies) < len(terms):
+        return _nothing()
+    total = counts.get_count(counts.ALL_POSTS, Post.objects.all())
+    weights = [
+        When(search_terms__term=term, then=ExpressionWrapper(
+            F('search_terms__frequency') * Value(
+                math.log(1 + total / frequencies[term])
+            ), output_field=FloatField()
+        ))
+        for term in terms
+    ]
+    return Post.objects.filter(search_terms__term__in=terms).annotate(
+        matched=Count('search_terms'),
+        score=Sum(Case(*weights, output_field=FloatField())),
+    ).filter(matched=len(terms))
+
+
+def search(query, group=None, author=None):
+    """Посты, содержащие все слова запроса, лучшие первыми."""
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return _nothing()
+    if uses_fts():
+        posts = _fts_search(terms)
+    else:
+        posts = _python_search(terms)
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    return posts.order_by('-score', '-pk')
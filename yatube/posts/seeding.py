@@ -0,0 +1,204 @@
+"""Быстрая загрузка больших синтетических наборов данных.
+
+Строки генерируют дочерние процессы кусками по chunk_size; у каждого
+куска свой генератор случайных чисел от (seed, вид, номер куска),
+поэтому данные не зависят от числа процессов. Родительский процесс
+пишет куски по порядку через executemany в отдельных транзакциях.
+id назначаются заранее, чтобы внешние ключи можно было сгенерировать
+без обращений к базе.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from faker.providers.lorem.ru_RU import Provider as LoremProvider
+
+from .models import Comment, Follow, Group, Post, User
+
+WORDS = LoremProvider.word_list
+# Чем больше, тем сильнее активность сосредоточена у первых id.
+SKEW = 2
+
+PLANS = {
+    User: ('id', 'username', 'password', 'first_name', 'last_name',
+           'email', 'is_superuser', 'is_staff', 'is_active',
+           'date_joined'),
+    Group: ('id', 'title', 'slug', 'description'),
+    Post: ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+           'comment_count'),
+    Comment: ('id', 'text', 'author_id', 'post_id', 'created'),
+    Follow: ('user_id', 'author_id'),
+}
+
+
+def _skewed(rng, count):
+    """Индекс 0..count-1 с тяжёлым хвостом у начала диапазона."""
+    return int(count * rng.random() ** SKEW)
+
+
+def _sentence(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _date(spec, position):
+    """Дата по позиции строки: старые id — старые даты.
+
+    Значение сразу приводится к виду для базы, чтобы эту работу делали
+    дочерние процессы, а не пишущий родитель.
+    """
+    return connection.ops.adapt_datetimefield_value(
+        spec['start'] + spec['span'] * (position / spec['total'])
+    )
+
+
+def generate(task):
+    """Строки куска: task = (модель, номер куска, первый id, число, spec)."""
+    model_name, chunk, first_id, count, spec = task
+    rng = random.Random(f'{spec["seed"]}:{model_name}:{chunk}')
+    rows = []
+    for offset in range(count):
+        pk = first_id + offset
+        position = pk - spec['first'][model_name]
+        if model_name == 'user':
+            rows.append((
+                pk, f'seed{pk}', '!', rng.choice(WORDS).title(), '',
+                f'seed{pk}@example.com', False, False, True,
+                _date(spec, 0),
+            ))
+        elif model_name == 'group':
+            rows.append((
+                pk, _sentence(rng, 1, 3)[:200], f'seed-{pk}',
+                _sentence(rng, 5, 20),
+            ))
+        elif model_name == 'post':
+            group_id = None
+            if spec['groups'] and rng.random() < 0.7:
+                group_id = spec['first']['group'] + rng.randrange(
+                    spec['groups']
+                )
+            rows.append((
+                pk, _sentence(rng, 5, 60),
+                _date(spec, position),
+                spec['first']['user'] + _skewed(rng, spec['users']),
+                group_id, '', 0,
+            ))
+        elif model_name == 'comment':
+            post = _skewed(rng, spec['posts'])
+            rows.append((
+                pk, _sentence(rng, 3, 20),
+                spec['first']['user'] + rng.randrange(spec['users']),
+                spec['first']['post'] + post,
+                _date(spec, post),
+            ))
+    return rows
+
+
+def follow_rows(rng, user_index, spec):
+    """Подписки одного пользователя на популярных авторов, без повторов."""
+    users = spec['users']
+    wanted = min(rng.randint(0, spec['follows'] * 2), users - 1)
+    authors = set()
+    while len(authors) < wanted:
+        author = _skewed(rng, users)
+        if author != user_index:
+            authors.add(author)
+    first = spec['first']['user']
+    return [(first + user_index, first + author) for author in sorted(authors)]
+
+
+def generate_follows(task):
+    _, chunk, first_user, count, spec = task
+    rng = random.Random(f'{spec["seed"]}:follow:{chunk}')
+    rows = []
+    for user_index in range(first_user, first_user + count):
+        rows += follow_rows(rng, user_index, spec)
+    return rows
+
+
+def next_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+def make_spec(users, groups, posts, comments, follows, days, seed):
+    first = {
+        'user': next_id(User), 'group': next_id(Group),
+        'post': next_id(Post), 'comment': next_id(Comment),
+    }
+    return {
+        'users': users, 'groups': groups, 'posts': posts,
+        'comments': comments, 'follows': follows, 'seed': seed,
+        'first': first, 'total': max(posts, 1),
+        'start': timezone.now() - timedelta(days=days),
+        'span': timedelta(days=days),
+    }
+
+
+def tasks(model_name, total, chunk_size, spec):
+    first = spec['first'].get(model_name, 0)
+    for chunk, start in enumerate(range(0, total, chunk_size)):
+        yield (
+            model_name, chunk, first + start,
+            min(chunk_size, total - start), spec,
+        )
+
+
+def insert(model, rows):
+    """Пишет строки одним executemany в транзакции."""
+    if not rows:
+        return
+    fields = PLANS[model]
+    columns = ', '.join(
+        connection.ops.quote_name(model._meta.get_field(name).column)
+        for name in fields
+    )
+    placeholders = ', '.join(['%s'] * len(fields))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} '
+            f'({columns}) VALUES ({placeholders})',
+            rows
+        )
+
+
+@contextmanager
+def deferred_indexes(model):
+    """Снимает индексы Meta.indexes на время загрузки и строит их заново.
+
+    Построить индекс по готовой таблице быстрее, чем обновлять его на
+    каждой вставке.
+    """
+    indexes = list(model._meta.indexes)
+    # Без контекстного менеджера: на SQLite он не работает в транзакции,
+    # а для CREATE/DROP INDEX не нужен.
+    editor = connection.schema_editor()
+    for index in indexes:
+        editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        for index in indexes:
+            editor.add_index(model, index)
+
+
+def reset_sequences():
+    """После вставки с явными id сдвигает последовательности (PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), list(PLANS)
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def forget_cache():
+    """Очищает кэш после загрузки мимо сигналов.
+
+    Счётчики лент и версии фрагментов в кэше после неё устарели.
+    """
+    cache.clear()
@@ -0,0 +1,226 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    conditional, counts, graph, search, thumbnails, timeline, versions
+)
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+def _post_feeds(post, group_id):
+    feeds = [counts.ALL_POSTS, counts.author_feed(post.author_id)]
+    if group_id is not None:
+        feeds.append(counts.group_feed(group_id))
+    return feeds
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        counts.adjust(_post_feeds(instance, instance.group_id), 1)
+        timeline.fan_out_post(instance)
+        return
+    previous = getattr(instance, '_previous_group_id', None)
+    if previous != instance.group_id:
+        if previous is not None:
+            counts.adjust([counts.group_feed(previous)], -1)
+        if instance.group_id is not None:
+            counts.adjust([counts.group_feed(instance.group_id)], 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counts.adjust(_post_feeds(instance, instance.group_id), -1)
+
+
+# Граф подписок правится первым: остальные обработчики Follow им
+# пользуются.
+@receiver(post_save, sender=Follow)
+def add_follow_edge(sender, instance, created, **kwargs):
+    if created:
+        graph.add(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_follow_edge(sender, instance, **kwargs):
+    graph.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def count_follow_change(sender, instance, **kwargs):
+    counts.invalidate([counts.follow_feed(instance.user_id)])
+
+
+@receiver(post_save, sender=Follow)
+def add_followed_posts(sender, instance, created, **kwargs):
+    if created:
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_unfollowed_posts(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+def _adjust_profile(user_id, delta):
+    updated = Profile.objects.filter(user_id=user_id).update(
+        post_count=F('post_count') + delta
+    )
+    if not updated and delta > 0:
+        Profile.objects.get_or_create(
+            user_id=user_id,
+            defaults={
+                'post_count': Post.objects.filter(author_id=user_id).count()
+            }
+        )
+
+
+def _adjust_follow_counts(follow, delta):
+    for field, user_id in (
+        ('following_count', follow.user_id),
+        ('follower_count', follow.author_id),
+    ):
+        profiles = Profile.objects.filter(user_id=user_id)
+        if delta < 0:
+            # Разошедшийся счётчик не должен уйти в минус.
+            profiles = profiles.filter(**{f'{field}__gt': 0})
+        profiles.update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        _adjust_follow_counts(instance, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    _adjust_follow_counts(instance, -1)
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_author_post(sender, instance, created, **kwargs):
+    if created:
+        _adjust_profile(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_author_post(sender, instance, **kwargs):
+    _adjust_profile(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=F('comment_count') - 1
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_versions(sender, instance, **kwargs):
+    keys = versions.post_feeds(instance, instance.group_id)
+    previous = getattr(instance, '_previous_group_id', None)
+    if previous is not None and previous != instance.group_id:
+        keys.append(versions.feed_key(counts.group_feed(previous)))
+    versions.bump(versions.post_key(instance.pk), *keys)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_post_version(sender, instance, **kwargs):
+    versions.bump(versions.post_key(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follows_version(sender, instance, **kwargs):
+    versions.bump(
+        versions.follows_key(instance.user_id),
+        versions.followers_key(instance.author_id),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_group_slug(sender, instance, **kwargs):
+    # Этот slug мог раньше принадлежать другой группе.
+    key = conditional.group_key(instance.slug)
+    versions.now_and_on_commit(lambda: cache.delete(key))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_username(sender, instance, **kwargs):
+    key = conditional.author_key(instance.username)
+    versions.now_and_on_commit(lambda: cache.delete(key))
+
+
+@receiver(post_delete, sender=Post)
+def forget_post_author(sender, instance, **kwargs):
+    key = conditional.post_author_key(instance.pk)
+    versions.now_and_on_commit(lambda: cache.delete(key))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_version(sender, instance, **kwargs):
+    versions.bump(
+        versions.group_key(instance.pk), versions.feed_key(versions.FEEDS)
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_author_version(sender, instance, created, update_fields=None,
+                        **kwargs):
+    if created or update_fields and set(update_fields) <= {
+        'last_login', 'password'
+    }:
+        return
+    versions.bump(
+        versions.author_key(instance.pk), versions.feed_key(versions.FEEDS)
+    )
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, **kwargs):
+    if instance.image and settings.THUMBNAIL_PREGENERATE:
+        thumbnails.schedule_all(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
@@ -0,0 +1,72 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.safestring import mark_safe
+
+from posts import holes, thumbnails, versions
+
+register = template.Library()
+
+
+@register.filter
+def with_card_versions(posts):
+    """Список постов с версиями для ключа кэша карточки.
+
+    Заодно одним запросом к кэшу достаёт готовые карточки (post.card_html),
+    чтобы шаблон не ходил в кэш за каждой, и одним запросом к базе
+    подгружает записи о миниатюрах картинок.
+    """
+    posts = versions.attach_card_versions(posts)
+    _attach_cards(posts)
+    thumbnails.prefetch(
+        post.image for post in posts if post.card_html is None
+    )
+    return posts
+
+
+def _fragment_cache():
+    # Тот же кэш, что выбирает тег {% cache %}.
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def _attach_cards(posts):
+    keys = {
+        post.pk: make_template_fragment_key(
+            'post_card', [post.pk, post.card_version]
+        )
+        for post in posts
+    }
+    found = _fragment_cache().get_many(list(keys.values()))
+    for post in posts:
+        html = found.get(keys[post.pk])
+        # Фрагмент отрисован нашим же шаблоном.
+        post.card_html = mark_safe(html) if html is not None else None
+
+
+@register.simple_tag
+def feed_version(feed):
+    return versions.feed_version(feed)
+
+
+@register.simple_tag
+def post_version(post_id):
+    return versions.get(versions.post_key(post_id))
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **params):
+    """Часть страницы, своя у каждого пользователя.
+
+    Обычно просто включает шаблон, как {% include %}. При рендере
+    оболочки для полностраничного кэша оставляет метку, которую
+    posts.holes заполняет при каждой выдаче; параметры должны
+    сериализоваться в JSON.
+    """
+    if getattr(context.get('request'), 'page_shell', False):
+        return mark_safe(holes.placeholder(template_name, params))
+    template = context.template.engine.get_template(template_name)
+    with context.push(**params):
+        return mark_safe(template.render(context))
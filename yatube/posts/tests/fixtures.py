@@ -0,0 +1,47 @@
+"""Общие данные и помощники тестов лент, кэша и API."""
+from contextlib import contextmanager
+
+from django.db import connection
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+
+
+class FeedDataMixin:
+    """Автор с постом в группе, его подписчик и посторонний пользователь.
+
+    URLS — страницы, на которых виден пост.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.stranger = User.objects.create_user(username='stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+        cls.URLS = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_posts', args=[cls.group.slug]),
+            'profile': reverse('posts:profile', args=[cls.author.username]),
+            'post': reverse('posts:post_detail', args=[cls.post.pk]),
+        }
+
+
+@contextmanager
+def commit_callbacks():
+    """Выполняет колбэки transaction.on_commit, добавленные в блоке.
+
+    TestCase не коммитит транзакцию теста, поэтому коммит имитируется
+    вызовом колбэков.
+    """
+    callbacks = len(connection.run_on_commit)
+    yield
+    for _, callback in connection.run_on_commit[callbacks:]:
+        callback()
@@ -0,0 +1,47 @@
+"""Проверка планов запросов SQLite в тестах представлений."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Служебные таблицы, полный просмотр которых допустим.
+ALLOWED_SCANS = ('sqlite_stat1', 'sqlite_master')
+
+
+class QueryPlanMixin:
+    """assertIndexedQueries: все SELECT идут по индексам и без сортировки.
+
+    Запросы собираются во время вызова func и повторно выполняются
+    с EXPLAIN QUERY PLAN. Ошибка — строка плана «SCAN <таблица>» без
+    индекса или «USE TEMP B-TREE FOR ORDER BY».
+    """
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def plan_problems(self, sql, allowed=()):
+        tables = set(connection.introspection.table_names())
+        problems = []
+        for detail in self.explain(sql):
+            if 'TEMP B-TREE FOR ORDER BY' in detail:
+                problems.append(detail)
+                continue
+            words = detail.split()
+            if words[0] != 'SCAN' or words[1] not in tables:
+                continue
+            if words[1] in ALLOWED_SCANS or words[1] in allowed:
+                continue
+            if 'INDEX' not in detail and 'CONSTANT ROW' not in detail:
+                problems.append(detail)
+        return problems
+
+    def assertIndexedQueries(self, func, allowed=()):
+        with CaptureQueriesContext(connection) as context:
+            result = func()
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            problems = self.plan_problems(sql, allowed)
+            self.assertFalse(problems, f'{sql}\n{problems}')
+        return result
@@ -0,0 +1,52 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .. import benchmark
+from ..models import Follow, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_and_run(self):
+        dataset = benchmark.seed(
+            users=6, posts=12, groups=2, comments=10, follows_per_user=2,
+            image_fraction=0
+        )
+        self.assertEqual(Post.objects.count(), 12)
+        self.assertFalse(Post.objects.exclude(image='').exists())
+        self.assertEqual(dataset['follows'], Follow.objects.count())
+
+        report = benchmark.run(total=24, concurrency=1)
+        self.assertEqual(report['requests'], 24)
+        for view, result in report['views'].items():
+            with self.subTest(view=view):
+                self.assertEqual(result['errors'], 0)
+                self.assertGreater(result['queries']['max'], 0)
+                self.assertLessEqual(
+                    result['latency_ms']['p50'], result['latency_ms']['p99']
+                )
+
+    def test_image_fraction(self):
+        benchmark.seed(
+            users=2, posts=4, groups=1, comments=0, follows_per_user=1,
+            image_fraction=1
+        )
+        self.assertEqual(Post.objects.exclude(image='').count(), 4)
+
+    def test_power_law_weights(self):
+        weights = benchmark.power_law_weights(4, 1)
+        self.assertEqual(weights, [1, 1 / 2, 1 / 3, 1 / 4])
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+
+
+@override_settings(COMMENT_LIMIT=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        for number in range(7):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Коммент {number}'
+            )
+        cls.POST_URL = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.COMMENTS_URL = reverse('posts:post_comments', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_renders_first_page(self):
+        response = self.client.get(self.POST_URL)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            ['Коммент 0', 'Коммент 1', 'Коммент 2']
+        )
+        self.assertNotContains(response, 'Коммент 3')
+        self.assertContains(response, comments.next_cursor)
+
+    def test_fragments_walk_all_comments(self):
+        cursor = self.client.get(self.POST_URL).context[
+            'comments'
+        ].next_cursor
+        texts = []
+        while cursor:
+            response = self.client.get(self.COMMENTS_URL, {'cursor': cursor})
+            self.assertTemplateUsed(response, 'posts/includes/comments.html')
+            page = response.context['comments']
+            texts += [comment.text for comment in page]
+            cursor = page.next_cursor
+        self.assertEqual(
+            texts, [f'Коммент {number}' for number in range(3, 7)]
+        )
+
+    def test_json_page(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.COMMENTS_URL, {'format': 'json'}
+            )
+        data = response.json()
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            ['Коммент 0', 'Коммент 1', 'Коммент 2']
+        )
+        self.assertEqual(data['comments'][0]['author'], 'author')
+        last = self.client.get(self.COMMENTS_URL, {
+            'format': 'json', 'cursor': data['next_cursor']
+        }).json()
+        self.assertEqual(last['comments'][0]['text'], 'Коммент 3')
+
+    def test_unknown_post_returns_404(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 100])
+        )
+        self.assertEqual(response.status_code, 404)
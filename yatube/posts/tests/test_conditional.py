@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import versions
+from ..models import Comment, Follow, Post
+from .fixtures import FeedDataMixin, commit_callbacks
+
+
+class ConditionalGetTests(FeedDataMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def etag(self, client, url):
+        # ETag появляется со второго показа, как и кэш страниц (holes).
+        client.get(url)
+        return client.get(url)['ETag']
+
+    def revalidate(self, client, url):
+        """(статус повторного запроса с If-None-Match, ETag)."""
+        etag = self.etag(client, url)
+        return client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, etag
+
+    def test_unchanged_pages_return_304(self):
+        urls = dict(self.URLS, follow=reverse('posts:follow_index'))
+        for name, url in urls.items():
+            with self.subTest(page=name):
+                status, _ = self.revalidate(self.reader_client, url)
+                self.assertEqual(status, 304)
+
+    def test_304_skips_main_query_and_render(self):
+        etag = self.client.get(self.URLS['index'])['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.URLS['index'], HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_changes_invalidate_etag(self):
+        etags = {
+            name: self.etag(self.client, url)
+            for name, url in self.URLS.items()
+        }
+        Post.objects.create(author=self.author, text='Ещё', group=self.group)
+        for name, url in self.URLS.items():
+            with self.subTest(page=name):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[name])
+                self.assertEqual(response.status_code, 200)
+
+        etag = self.client.get(self.URLS['post'])['ETag']
+        Comment.objects.create(post=self.post, author=self.reader, text='К')
+        self.assertEqual(self.client.get(
+            self.URLS['post'], HTTP_IF_NONE_MATCH=etag
+        ).status_code, 200)
+
+        etag = self.client.get(self.URLS['group'])['ETag']
+        self.group.title = 'Новое имя'
+        self.group.save()
+        self.assertEqual(self.client.get(
+            self.URLS['group'], HTTP_IF_NONE_MATCH=etag
+        ).status_code, 200)
+
+    def test_etag_depends_on_user_and_follows(self):
+        stranger_client = Client()
+        stranger_client.force_login(self.stranger)
+        anonymous = self.client.get(self.URLS['profile'])['ETag']
+        etag = stranger_client.get(self.URLS['profile'])['ETag']
+        self.assertNotEqual(anonymous, etag)
+
+        follow_url = reverse('posts:follow_index')
+        follow_etag = stranger_client.get(follow_url)['ETag']
+        Follow.objects.create(user=self.stranger, author=self.author)
+        for url, old in ((self.URLS['profile'], etag),
+                         (follow_url, follow_etag)):
+            with self.subTest(url=url):
+                self.assertEqual(stranger_client.get(
+                    url, HTTP_IF_NONE_MATCH=old
+                ).status_code, 200)
+
+    def test_cold_post_page_is_served_without_etag(self):
+        response = self.client.get(self.URLS['post'])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertTrue(self.client.get(self.URLS['post']).has_header('ETag'))
+
+    def test_missing_objects_still_404(self):
+        self.assertEqual(self.client.get(
+            reverse('posts:group_posts', args=['missing'])
+        ).status_code, 404)
+        self.assertEqual(self.client.get(
+            reverse('posts:post_detail', args=[0])
+        ).status_code, 404)
+
+    def test_versions_change_again_after_commit(self):
+        key = versions.post_key(self.post.pk)
+        before = versions.get(key)
+        with commit_callbacks():
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='К'
+            )
+            bumped = versions.get(key)
+            self.assertNotEqual(bumped, before)
+        self.assertNotIn(versions.get(key), (before, bumped))
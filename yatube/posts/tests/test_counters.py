@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, Profile, User
+
+
+class FollowCountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Post.objects.create(author=cls.author, text='Пост')
+        cls.PROFILE_URL = reverse('posts:profile', args=['author'])
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def profile(self, user):
+        return Profile.objects.get(user=user)
+
+    def test_follow_and_unfollow_update_counters(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=['author'])
+        )
+        self.assertEqual(self.profile(self.author).follower_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=['author'])
+        )
+        self.assertEqual(self.profile(self.author).follower_count, 0)
+        self.assertEqual(self.profile(self.reader).following_count, 0)
+
+    def test_deleted_user_releases_counters(self):
+        follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=follower, author=self.author)
+        follower.delete()
+        self.assertEqual(self.profile(self.author).follower_count, 0)
+
+    def test_profile_shows_counters_and_changes_etag(self):
+        response = self.client.get(self.PROFILE_URL)
+        self.assertContains(response, 'Всего постов: 1')
+        self.assertContains(response, 'Подписчиков: 0')
+        etag = response['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(
+            self.PROFILE_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Подписчиков: 1')
+
+    def test_reconcile_command_fixes_drift(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Profile.objects.filter(user=self.author).update(
+            follower_count=5, post_count=0
+        )
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('profile.follower_count: расхождений 1', out.getvalue())
+        author = self.profile(self.author)
+        self.assertEqual(author.follower_count, 1)
+        self.assertEqual(author.post_count, 1)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Расхождений нет', out.getvalue())
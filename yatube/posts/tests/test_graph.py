@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import graph
+from ..models import Follow, User
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def follow(self, user, author):
+        return Follow.objects.create(user=user, author=author)
+
+    def test_signals_update_cached_sets(self):
+        first, second, third, _ = self.users
+        self.follow(first, third)
+        self.assertEqual(list(graph.following(first.pk)), [third.pk])
+        self.assertEqual(list(graph.followers(third.pk)), [first.pk])
+        self.follow(first, second)
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.is_following(first.pk, second.pk))
+            self.assertEqual(graph.following_count(first.pk), 2)
+        self.assertEqual(
+            list(graph.following(first.pk)), sorted([second.pk, third.pk])
+        )
+        Follow.objects.filter(user=first, author=third).delete()
+        with self.assertNumQueries(0):
+            self.assertFalse(graph.is_following(first.pk, third.pk))
+            self.assertEqual(graph.follower_count(third.pk), 0)
+
+    def test_followed_by_following(self):
+        viewer, friend, other, author = self.users
+        self.follow(viewer, friend)
+        self.follow(viewer, other)
+        self.follow(friend, author)
+        self.assertEqual(
+            list(graph.followed_by_following(viewer.pk, author.pk)),
+            [friend.pk]
+        )
+        self.assertEqual(
+            list(graph.followed_by_following(None, author.pk)), []
+        )
+
+    def test_profile_uses_graph(self):
+        viewer, friend, _, author = self.users
+        self.follow(viewer, friend)
+        self.follow(friend, author)
+        client = Client()
+        client.force_login(viewer)
+        url = reverse('posts:profile', args=[author.username])
+        response = client.get(url)
+        self.assertFalse(response.context['following'])
+        self.assertEqual(response.context['followed_by'], 1)
+        self.assertContains(response, 'Из ваших подписок на автора')
+        client.get(reverse('posts:profile_follow', args=[author.username]))
+        self.assertTrue(client.get(url).context['following'])
+        client.get(reverse('posts:profile_unfollow', args=[author.username]))
+        self.assertFalse(Follow.objects.filter(
+            user=viewer, author=author
+        ).exists())
+
+    def test_follow_views_ignore_stale_graph(self):
+        viewer, _, _, author = self.users
+        client = Client()
+        client.force_login(viewer)
+        self.assertFalse(graph.is_following(viewer.pk, author.pk))
+        # bulk_create не шлёт сигналов: граф в кэше отстал от базы.
+        Follow.objects.bulk_create([Follow(user=viewer, author=author)])
+        response = client.get(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            Follow.objects.filter(user=viewer, author=author).count(), 1
+        )
+        client.get(reverse('posts:profile_unfollow', args=[author.username]))
+        self.assertFalse(Follow.objects.filter(
+            user=viewer, author=author
+        ).exists())
@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from ..models import Comment, Post
+from .fixtures import FeedDataMixin
+
+
+class PageCacheTests(FeedDataMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.stranger_client = Client()
+        self.stranger_client.force_login(self.stranger)
+
+    def page(self, client, url):
+        # Первый показ поста запоминает автора: кэш работает со второго.
+        client.get(url)
+        return client.get(url).content.decode()
+
+    def test_anonymous_page_served_without_queries(self):
+        for name, url in self.URLS.items():
+            with self.subTest(page=name):
+                content = self.page(self.client, url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response.content.decode(), content)
+                self.assertIn('Войти', content)
+                self.assertNotIn('hole:', content)
+
+    def test_shell_shared_between_users(self):
+        url = self.URLS['profile']
+        reader_page = self.page(self.reader_client, url)
+        stranger_page = self.stranger_client.get(url).content.decode()
+        self.assertIn('Пользователь: reader', reader_page)
+        self.assertIn('Отписаться', reader_page)
+        self.assertIn('Пользователь: stranger', stranger_page)
+        self.assertIn('Подписаться', stranger_page)
+        self.assertNotIn('Пользователь: reader', stranger_page)
+
+    def test_comment_form_rendered_per_request(self):
+        url = self.URLS['post']
+        self.page(self.reader_client, url)
+        self.assertNotIn(
+            'Добавить комментарий', self.page(self.client, url)
+        )
+        content = self.reader_client.get(url).content.decode()
+        self.assertIn('Добавить комментарий', content)
+        self.assertIn('csrfmiddlewaretoken', content)
+
+    def test_changes_invalidate_pages(self):
+        pages = {
+            name: self.page(self.client, url)
+            for name, url in self.URLS.items()
+        }
+        Post.objects.create(author=self.author, text='Новый', group=self.group)
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(page=name):
+                content = self.client.get(self.URLS[name]).content.decode()
+                self.assertNotEqual(content, pages[name])
+                self.assertIn('Новый', content)
+
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.assertIn(
+            'Комментарий', self.client.get(self.URLS['post']).content.decode()
+        )
+
+        self.group.description = 'Другое описание'
+        self.group.save()
+        self.assertIn(
+            'Другое описание',
+            self.client.get(self.URLS['group']).content.decode()
+        )
+
+    def test_query_string_is_part_of_key(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Лента {number}')
+            for number in range(10)
+        )
+        first = self.page(self.client, self.URLS['index'])
+        second = self.page(self.client, self.URLS['index'] + '?page=2')
+        self.assertNotIn('>Пост<', first)
+        self.assertIn('Пост', second)
+        self.assertNotIn('Лента 9', second)
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import counts
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+RANGE_POSTS = 15
+
+
+class FeedCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.GROUP_LIST_URL = reverse(
+            'posts:group_posts', kwargs={'slug': cls.group.slug}
+        )
+
+    def setUp(self):
+        cache.clear()
+        for num in range(RANGE_POSTS):
+            Post.objects.create(
+                text=f'Тестовый текст {num}',
+                author=self.user,
+                group=self.group,
+            )
+
+    def test_count_is_cached_and_follows_signals(self):
+        feed = counts.group_feed(self.group.pk)
+        self.client.get(self.GROUP_LIST_URL)
+        self.assertEqual(cache.get(counts.KEY_TEMPLATE.format(feed)), 15)
+        Post.objects.create(text='ещё', author=self.user, group=self.group)
+        Post.objects.first().delete()
+        Post.objects.create(text='и ещё', author=self.user, group=self.group)
+        self.assertEqual(cache.get(counts.KEY_TEMPLATE.format(feed)), 16)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.GROUP_LIST_URL + '?page=1')
+        self.assertEqual(response.context['paginator'].count, 16)
+
+    def test_follow_feed_count_invalidated_on_follow(self):
+        self.client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        response = self.client.get(url)
+        self.assertEqual(response.context['paginator'].count, 0)
+        Follow.objects.create(user=self.reader, author=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.context['paginator'].count, RANGE_POSTS)
+
+    def test_new_post_does_not_touch_follower_counts(self):
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        self.client.get(url)
+        key = counts.KEY_TEMPLATE.format(counts.follow_feed(self.reader.pk))
+        Post.objects.create(text='новый', author=self.user)
+        self.assertEqual(cache.get(key), RANGE_POSTS)
+        response = self.client.get(url + '?page=2')
+        self.assertEqual(response.context['paginator'].count, RANGE_POSTS + 1)
+
+    # Страница из полностраничного кэша отдаётся без контекста.
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_stale_count_heals_itself(self):
+        feed = counts.group_feed(self.group.pk)
+        counts.set_count(feed, 3)
+        response = self.client.get(self.GROUP_LIST_URL + '?page=2')
+        self.assertEqual(
+            len(response.context['page_obj']),
+            RANGE_POSTS - settings.POST_LIMIT
+        )
+        self.assertEqual(response.context['paginator'].count, RANGE_POSTS)
+        counts.set_count(feed, 100)
+        response = self.client.get(self.GROUP_LIST_URL + '?page=2')
+        self.assertEqual(response.context['paginator'].count, RANGE_POSTS)
+        counts.set_count(feed, 100)
+        response = self.client.get(self.GROUP_LIST_URL + '?page=7')
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    @override_settings(PAGE_NUMBER_LIMIT=1)
+    def test_page_number_past_limit_opens_that_page(self):
+        response = self.client.get(self.GROUP_LIST_URL + '?page=2')
+        self.assertEqual(response.status_code, 200)
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(page_obj[0].text, 'Тестовый текст 4')
+        self.assertEqual(list(response.context['page_range']), [1])
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from .fixtures import FeedDataMixin
+from .query_plans import QueryPlanMixin
+
+
+class QueryPlanTests(FeedDataMixin, QueryPlanMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Comment.objects.create(
+            text='Комментарий', author=cls.reader, post=cls.post
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_views_use_indexes(self):
+        urls = [*self.URLS.values(), reverse('posts:follow_index')]
+        for url in urls:
+            for params in ({}, {'page': 2}):
+                with self.subTest(url=url, params=params):
+                    self.assertIndexedQueries(
+                        lambda: self.client.get(url, params)
+                    )
+
+    def test_helper_detects_scans_and_sorts(self):
+        self.assertTrue(self.plan_problems(
+            str(Post.objects.filter(comment_count=1).order_by().query)
+        ))
+        self.assertTrue(self.plan_problems(
+            str(Post.objects.order_by('text').query)
+        ))
+        self.assertFalse(self.plan_problems(str(Post.objects.all().query)))
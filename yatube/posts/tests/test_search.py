@@ -0,0 +1,124 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post, SearchTerm
+
+User = get_user_model()
+
+RANGE_POSTS = 13
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test_slug', description='Описание'
+        )
+        cls.SEARCH_URL = reverse('posts:search')
+
+    def setUp(self):
+        cache.clear()
+        self.relevant = Post.objects.create(
+            text='Котики котики и ещё раз котики', author=self.author
+        )
+        self.grouped = Post.objects.create(
+            text='Котики в группе', author=self.author, group=self.group
+        )
+        self.foreign = Post.objects.create(
+            text='Чужие котики и собаки', author=self.other
+        )
+        Post.objects.create(text='Только собаки', author=self.other)
+
+    def found(self, query, **filters):
+        return list(search.search(query, **filters))
+
+    def check_search(self):
+        self.assertEqual(
+            self.found('КОТИКИ')[0], self.relevant,
+            'Чаще встречающееся слово должно поднимать пост выше'
+        )
+        self.assertEqual(len(self.found('котики')), 3)
+        self.assertEqual(self.found('котики собаки'), [self.foreign])
+        self.assertEqual(self.found('котики', group=self.group),
+                         [self.grouped])
+        self.assertEqual(len(self.found('котики', author=self.author)), 2)
+        self.assertEqual(self.found('жирафы'), [])
+        self.assertEqual(self.found('!!!'), [])
+
+    def check_updates(self):
+        self.relevant.text = 'Теперь про жирафов'
+        self.relevant.save()
+        self.assertEqual(self.found('жирафов'), [self.relevant])
+        self.assertNotIn(self.relevant, self.found('котики'))
+        self.grouped.delete()
+        self.assertEqual(self.found('котики'), [self.foreign])
+
+    def test_fts_search(self):
+        self.assertTrue(search.uses_fts())
+        self.check_search()
+        self.check_updates()
+        self.assertFalse(SearchTerm.objects.exists())
+
+    @override_settings(SEARCH_BACKEND='python')
+    def test_python_search(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertTrue(SearchTerm.objects.exists())
+        self.check_search()
+        self.check_updates()
+
+    def test_rebuild_command(self):
+        Post.objects.bulk_create(
+            [Post(text='Слон', author=self.author)]
+        )
+        self.assertEqual(self.found('слон'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.found('слон')), 1)
+
+    def test_search_view_pagination(self):
+        for backend in ('auto', 'python'):
+            with self.subTest(backend=backend), override_settings(
+                SEARCH_BACKEND=backend
+            ):
+                for num in range(RANGE_POSTS):
+                    Post.objects.create(
+                        text=f'Лось номер {num}', author=self.author
+                    )
+                response = self.client.get(
+                    self.SEARCH_URL, {'q': 'лось', 'author': 'author'}
+                )
+                page_obj = response.context['page_obj']
+                self.assertEqual(page_obj.paginator.count, RANGE_POSTS)
+                self.assertIn('q=%D0%BB%D0%BE%D1%81%D1%8C&amp;',
+                              response.content.decode())
+                seen = [post.pk for post in page_obj]
+                response = self.client.get(self.SEARCH_URL, {
+                    'q': 'лось', 'cursor': response.context['next_cursor']
+                })
+                seen += [post.pk for post in response.context['page_obj']]
+                self.assertEqual(len(set(seen)), RANGE_POSTS)
+                Post.objects.filter(text__startswith='Лось').delete()
+
+    def test_search_view_unknown_author(self):
+        response = self.client.get(
+            self.SEARCH_URL, {'q': 'котики', 'author': 'nobody'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_admin_uses_index(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 2)
@@ -0,0 +1,50 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from .. import search
+from ..models import Comment, Follow, Group, Post, Profile, User
+
+
+class SeedDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def seed(self, **options):
+        call_command(
+            'seed_data', users=8, groups=2, posts=50, comments=40,
+            follows=2, chunk_size=16, workers=1, stdout=StringIO(),
+            **options
+        )
+
+    def test_seed_data(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 8)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists()
+        )
+        for post in Post.objects.all():
+            self.assertEqual(post.comment_count, post.comments.count())
+        for profile in Profile.objects.all():
+            self.assertEqual(
+                profile.post_count, profile.user.posts.count()
+            )
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(search.search(word).exists())
+
+    def test_seed_is_deterministic(self):
+        self.seed(skip_rebuild=True)
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', flat=True
+        ))
+        self.seed(skip_rebuild=True)
+        second = list(Post.objects.order_by('pk').values_list(
+            'text', flat=True
+        ))
+        self.assertEqual(first, second[len(first):])
@@ -0,0 +1,185 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnails._pending.clear()
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='auth'),
+            text='Тестовый текст',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_saved_image_is_generated_after_commit(self):
+        self.assertFalse(thumbnails._pending)
+        for _, callback in connection.run_on_commit:
+            callback()
+        geometry, options = thumbnails.GEOMETRIES[0]
+        image = default.backend.get_thumbnail(
+            self.post.image, geometry, **options
+        )
+        self.assertNotEqual(image.name, self.post.image.name)
+
+    def test_generated_thumbnail_replaces_cached_card(self):
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), self.post.image.url)
+        thumbnails.generate_all(self.post.image.name)
+        response = self.client.get(url)
+        self.assertNotContains(response, self.post.image.url)
+        self.assertContains(response, self.thumbnail(self.post).url)
+
+    def test_rollback_does_not_pin_key(self):
+        callbacks = len(connection.run_on_commit)
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                thumbnails.schedule_all(self.post.image.name)
+                raise DatabaseError
+        self.assertEqual(len(connection.run_on_commit), callbacks)
+        self.assertFalse(thumbnails._pending)
+
+    def test_backend_does_not_resize_in_request(self):
+        geometry, options = thumbnails.GEOMETRIES[0]
+        image = default.backend.get_thumbnail(
+            self.post.image, geometry, **options
+        )
+        self.assertEqual(image.name, self.post.image.name)
+
+        thumbnails.generate_all(self.post.image.name)
+        image = default.backend.get_thumbnail(
+            self.post.image, geometry, **options
+        )
+        self.assertNotEqual(image.name, self.post.image.name)
+        self.assertTrue(image.exists())
+        self.assertEqual(image.x, 960)
+
+    def test_missing_source_is_skipped(self):
+        self.assertEqual(
+            thumbnails.generate_all('posts/missing.gif'), [None]
+        )
+
+    def test_templates_use_known_geometries(self):
+        known = {geometry for geometry, _ in thumbnails.GEOMETRIES}
+        pattern = re.compile(r'{% thumbnail \S+ "([^"]+)"')
+        templates = Path(settings.TEMPLATES_DIR)
+        for path in templates.rglob('*.html'):
+            for geometry in pattern.findall(path.read_text()):
+                with self.subTest(template=path.name):
+                    self.assertIn(geometry, known)
+
+    def warm(self, **options):
+        call_command(
+            'warm_thumbnails', workers=1, stdout=StringIO(),
+            checkpoint=os.path.join(TEMP_MEDIA_ROOT, '.warm'), **options
+        )
+
+    def thumbnail(self, post):
+        geometry, options = thumbnails.GEOMETRIES[0]
+        return default.backend.get_thumbnail(post.image, geometry, **options)
+
+    def test_warm_command_resumes_from_checkpoint(self):
+        with open(os.path.join(TEMP_MEDIA_ROOT, '.warm'), 'w') as file:
+            file.write(str(self.post.pk))
+        self.warm()
+        self.assertEqual(self.thumbnail(self.post).name, self.post.image.name)
+        self.assertFalse(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, '.warm'))
+        )
+
+        self.warm(restart=True)
+        self.assertNotEqual(
+            self.thumbnail(self.post).name, self.post.image.name
+        )
+
+    def test_warm_command_removes_orphans(self):
+        self.warm()
+        orphan = self.thumbnail(self.post)
+        stray = default.storage.save('cache/ab/stray.jpg', ContentFile(b'x'))
+        self.post.delete()
+        kept = Post.objects.create(
+            author=self.post.author,
+            text='Другой пост',
+            image=SimpleUploadedFile('other.gif', SMALL_GIF, 'image/gif'),
+        )
+
+        self.warm(cleanup=True)
+        self.assertFalse(orphan.exists())
+        self.assertFalse(default.storage.exists(stray))
+        self.assertTrue(self.thumbnail(kept).exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BackgroundThumbnailTests(TransactionTestCase):
+    """Миниатюры из пула потоков: транзакции коммитятся по-настоящему."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnails._pending.clear()
+
+    def wait_for_pool(self):
+        deadline = time.monotonic() + 5
+        while thumbnails._pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(thumbnails._pending)
+
+    def test_pool_generates_thumbnail_and_refreshes_card(self):
+        post = Post.objects.create(
+            author=User.objects.create_user(username='auth'),
+            text='Тестовый текст',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.wait_for_pool()
+        geometry, options = thumbnails.GEOMETRIES[0]
+        thumbnail = default.backend.get_thumbnail(
+            post.image, geometry, **options
+        )
+        self.assertNotEqual(thumbnail.name, post.image.name)
+        self.assertContains(self.client.get(url), thumbnail.url)
@@ -0,0 +1,130 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import FeedEntry, Follow, Post, Profile
+from .fixtures import commit_callbacks
+
+User = get_user_model()
+
+RANGE_POSTS = 12
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.FOLLOW_URL = reverse('posts:follow_index')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+        for num in range(RANGE_POSTS):
+            Post.objects.create(text=f'Пост {num}', author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.other)
+
+    def feed_ids(self):
+        seen = []
+        response = self.client.get(self.FOLLOW_URL)
+        while True:
+            seen += [post.pk for post in response.context['page_obj']]
+            cursor = response.context['next_cursor']
+            if not cursor:
+                return seen
+            response = self.client.get(self.FOLLOW_URL, {'cursor': cursor})
+
+    def test_follow_copies_and_unfollow_removes_entries(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), RANGE_POSTS
+        )
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(
+            self.feed_ids(),
+            list(self.author.posts.values_list('pk', flat=True))
+        )
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_celebrity_posts_are_read_on_request(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.other)
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        response = self.client.get(self.FOLLOW_URL)
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POST_LIMIT
+        )
+        self.assertEqual(len(self.feed_ids()), RANGE_POSTS + 2)
+
+    def unfollow(self, user):
+        with commit_callbacks():
+            Follow.objects.filter(user=user, author=self.author).delete()
+
+    @override_settings(
+        FEED_FANOUT_MAX_FOLLOWERS=1, FEED_FANOUT_MIN_FOLLOWERS=2,
+        FEED_BACKFILL_WORKERS=0
+    )
+    def test_author_back_to_fan_out_keeps_posts(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        self.assertTrue(Profile.objects.get(user=self.author).celebrity)
+        post = Post.objects.create(text='Пост звезды', author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.unfollow(self.other)
+        self.assertFalse(Profile.objects.get(user=self.author).celebrity)
+        self.assertFalse(FeedEntry.objects.filter(user=self.other).exists())
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(
+            self.feed_ids(),
+            list(self.author.posts.values_list('pk', flat=True))
+        )
+
+    @override_settings(
+        FEED_FANOUT_MAX_FOLLOWERS=1, FEED_FANOUT_MIN_FOLLOWERS=1,
+        FEED_BACKFILL_WORKERS=0
+    )
+    def test_threshold_has_margin(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='Пост звезды', author=self.author)
+        self.unfollow(self.other)
+        self.assertTrue(Profile.objects.get(user=self.author).celebrity)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+
+    def test_migration_fills_existing_feeds(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        FeedEntry.objects.all().delete()
+        import_module('posts.migrations.0007_feedentry').fill_feeds(
+            apps, None
+        )
+        self.assertEqual(
+            self.feed_ids(),
+            list(self.author.posts.values_list('pk', flat=True))
+        )
+
+    def test_rebuild_timelines_command(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command(
+            'rebuild_timelines', user_ids=[self.reader.pk], stdout=StringIO()
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), RANGE_POSTS
+        )
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import counters, transfer
+from ..models import Comment, Follow, Group, Post, User
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for num in range(5):
+            post = Post.objects.create(
+                author=cls.author, text=f'Пост {num}',
+                group=cls.group if num % 2 else None,
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text=f'Комментарий {num}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp(dir=TEMP_DIR)
+
+    def export(self, **options):
+        return transfer.export(self.directory, chunk_size=2, **options)
+
+    def snapshot(self):
+        return sorted(
+            (comment.post.text, comment.post.author.username,
+             getattr(comment.post.group, 'slug', None), comment.text)
+            for comment in Comment.objects.select_related(
+                'post__author', 'post__group'
+            )
+        )
+
+    def reload(self, **options):
+        """Очищает базу и загружает выгрузку обратно."""
+        expected = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        transfer.Importer(self.directory, batch_size=2, **options).run()
+        counters.rebuild()
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_roundtrip_formats(self):
+        for fmt in transfer.FORMATS:
+            for compress in (False, True):
+                with self.subTest(fmt=fmt, gzip=compress):
+                    self.directory = tempfile.mkdtemp(dir=TEMP_DIR)
+                    totals = self.export(fmt=fmt, compress=compress)
+                    self.assertEqual(totals['posts'], 5)
+                    self.reload()
+                    self.assertTrue(Follow.objects.filter(
+                        user__username='reader',
+                        author__username='author',
+                    ).exists())
+
+    def test_import_matches_existing_users_and_groups(self):
+        self.export()
+        transfer.Importer(self.directory).run()
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(self.author.posts.count(), 10)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_import_resumes_without_duplicates(self):
+        self.export()
+        expected = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+        def interrupt(name, rows):
+            if name == 'posts':
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            transfer.Importer(self.directory, batch_size=2).run(interrupt)
+        self.assertEqual(Post.objects.count(), 2)
+        # Прогресс потерян после записи куска: кусок повторится.
+        state = transfer.ImportState(
+            os.path.join(self.directory, '.import-state.sqlite3')
+        )
+        state.connection.execute(
+            "UPDATE progress SET done = 0 WHERE model = 'posts'"
+        )
+        state.connection.commit()
+        state.close()
+        transfer.Importer(self.directory, batch_size=2).run()
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_resume_skips_ids_taken_between_runs(self):
+        self.export()
+        expected = self.snapshot()
+        dates = sorted(Post.objects.values_list('pub_date', flat=True))
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+        def interrupt(name, rows):
+            if name == 'posts':
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            transfer.Importer(self.directory, batch_size=2).run(interrupt)
+        # Пока загрузка стоит, в базе появляются посты с теми же id.
+        intruder = User.objects.create_user(username='intruder')
+        last = Post.objects.order_by('-pk').first().pk
+        for pk in (last + 1, last + 2):
+            Post.objects.create(pk=pk, author=intruder, text='Чужой пост')
+        transfer.Importer(self.directory, batch_size=2).run()
+        self.assertEqual(self.snapshot(), expected)
+        self.assertEqual(
+            Post.objects.filter(author=intruder, text='Чужой пост').count(), 2
+        )
+        self.assertEqual(
+            sorted(Post.objects.exclude(
+                author=intruder
+            ).values_list('pub_date', flat=True)),
+            dates
+        )
+        self.assertEqual(Post.objects.count(), 7)
+
+    def test_commands(self):
+        call_command('export_data', self.directory, format='csv',
+                     gzip=True, stdout=open(os.devnull, 'w'))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory, 'posts.csv.gz')
+        ))
+        call_command('import_data', self.directory, restart=True,
+                     stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.author.posts.count(), 10)
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.post_count, 10)
@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase, Client
 from django.urls import reverse
 
@@ -40,6 +41,7 @@ class PostURLTest(TestCase):
         cls.FOLLOW_INDEX_URL = reverse('posts:follow_index')
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
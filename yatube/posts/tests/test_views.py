@@ -5,7 +5,7 @@ from django import forms
 from django.conf import settings
 from django.core.cache import cache
 
-from ..models import Post, Group, Follow
+from ..models import Post, Group, Follow, Comment
 
 User = get_user_model()
 
@@ -45,6 +45,7 @@ class PostViewTests(TestCase):
         cls.CREATE_POST_URL = reverse('posts:post_create')
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(PostViewTests.user)
@@ -179,20 +180,125 @@ class PostViewTests(TestCase):
                         len(response.context['page_obj']), count_page
                     )
 
+    def test_cursor_pagination_walks_whole_feed(self):
+        expected = list(Post.objects.values_list('pk', flat=True))
+        for page in (self.INDEX_URL, self.GROUP_LIST_URL, self.PROFILE_URL):
+            with self.subTest(page=page):
+                response = self.client.get(page)
+                seen = [post.pk for post in response.context['page_obj']]
+                cursor = response.context['next_cursor']
+                while cursor:
+                    response = self.client.get(page, {'cursor': cursor})
+                    seen += [post.pk for post in response.context['page_obj']]
+                    cursor = response.context['next_cursor']
+                self.assertEqual(seen, expected)
+                previous = response.context['previous_cursor']
+                response = self.client.get(page, {'cursor': previous})
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    expected[:settings.POST_LIMIT]
+                )
+
+    def test_cursor_pagination_last_and_broken_cursor(self):
+        response = self.client.get(self.INDEX_URL)
+        last = self.client.get(
+            self.INDEX_URL, {'cursor': response.context['last_cursor']}
+        )
+        self.assertEqual(
+            last.context['page_obj'][-1].pk,
+            Post.objects.order_by('pub_date', 'pk').first().pk
+        )
+        self.assertFalse(last.context['page_obj'].has_next())
+        broken = self.client.get(self.INDEX_URL, {'cursor': 'not-a-cursor'})
+        self.assertEqual(
+            [post.pk for post in broken.context['page_obj']],
+            [post.pk for post in response.context['page_obj']]
+        )
+
+    def test_post_detail_query_count_does_not_depend_on_comments(self):
+        with self.assertNumQueries(2):
+            self.client.get(self.POST_DETAIL_URL)
+        for num in range(5):
+            commentator = User.objects.create(username=f'reader{num}')
+            Comment.objects.create(
+                post=self.post, author=commentator, text=f'Коммент {num}'
+            )
+        with self.assertNumQueries(2):
+            response = self.client.get(self.POST_DETAIL_URL)
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertEqual(response.context['post'].comment_count, 5)
+
+    def test_denormalized_counters(self):
+        post_count = User.objects.get(pk=self.user.pk).profile.post_count
+        new_post = Post.objects.create(text='Тест текст', author=self.user)
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).profile.post_count,
+            post_count + 1
+        )
+        new_post.delete()
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).profile.post_count, post_count
+        )
+        post = Post.objects.first()
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Коммент'
+        )
+        self.assertEqual(Post.objects.get(pk=post.pk).comment_count, 1)
+        comment.delete()
+        self.assertEqual(Post.objects.get(pk=post.pk).comment_count, 0)
+
     def test_cached_index_page(self):
         response = self.authorized_client.get(self.INDEX_URL)
         posts = response.content
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        response_old = self.authorized_client.get(self.INDEX_URL)
+        self.assertEqual(response_old.content, posts)
         Post.objects.create(
             text='test_new_post',
             author=self.user,
         )
-        response_old = self.authorized_client.get(self.INDEX_URL)
-        old_posts = response_old.content
-        self.assertEqual(old_posts, posts)
-        cache.clear()
         response_new = self.authorized_client.get(self.INDEX_URL)
-        new_posts = response_new.content
-        self.assertNotEqual(old_posts, new_posts)
+        self.assertNotEqual(response_new.content, posts)
+        self.assertContains(response_new, 'test_new_post')
+
+    def test_fragment_cache_invalidated_on_changes(self):
+        self.client.get(self.GROUP_LIST_URL)
+        post = Post.objects.first()
+        post.text = 'Отредактированный пост'
+        post.save()
+        self.assertContains(
+            self.client.get(self.GROUP_LIST_URL), 'Отредактированный пост'
+        )
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое имя группы'
+        group.save()
+        self.assertContains(
+            self.client.get(self.INDEX_URL), 'Новое имя группы'
+        )
+        self.client.get(self.POST_DETAIL_URL)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Свежий коммент'
+        )
+        self.assertContains(
+            self.client.get(self.POST_DETAIL_URL), 'Свежий коммент'
+        )
+
+    def test_card_fragments_are_shared_between_feeds(self):
+        self.client.get(self.INDEX_URL)
+        # Карточка уже в кэше: вторая лента берёт её готовой,
+        # даже если пост изменили без сигналов.
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        response = self.client.get(self.GROUP_LIST_URL)
+        self.assertContains(response, self.post.text)
+        self.assertNotContains(response, 'Без сигналов')
+
+    def test_profile_following_flag(self):
+        author = User.objects.create(username='Mayakovsky')
+        url = reverse('posts:profile', kwargs={'username': author.username})
+        self.assertFalse(self.authorized_client.get(url).context['following'])
+        Follow.objects.create(user=self.user, author=author)
+        self.assertTrue(self.authorized_client.get(url).context['following'])
+        self.assertFalse(self.client.get(url).context['following'])
 
     def test_wrong_url_returns_custom_404(self):
         response = self.client.get('/wrong_url/')
@@ -0,0 +1,141 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import writebehind
+from ..models import Comment, Group, Post, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    WRITE_BEHIND=True, WRITE_BEHIND_JOURNAL=f'{TEMP_DIR}/journal.sqlite3'
+)
+class WriteBehindTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        writebehind._connection().execute('DELETE FROM entries')
+        writebehind.close()
+
+    def test_post_is_queued_and_shown_to_author(self):
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Отложенный пост', 'group': self.group.pk,
+        })
+        self.assertRedirects(
+            response, reverse('posts:profile', args=[self.user.username])
+        )
+        self.assertFalse(Post.objects.filter(text='Отложенный пост'))
+        profile = reverse('posts:profile', args=[self.user.username])
+        self.assertContains(self.client.get(profile), 'Отложенный пост')
+        self.assertNotContains(Client().get(profile), 'Отложенный пост')
+
+        call_command('process_write_behind', once=True, stdout=StringIO())
+        post = Post.objects.get(text='Отложенный пост')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(writebehind.backlog(), 0)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.post_count, 2)
+
+    def test_comment_is_queued_and_shown_to_author(self):
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Отложенный комментарий'}
+        )
+        self.assertFalse(Comment.objects.exists())
+        detail = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertContains(self.client.get(detail), 'Отложенный комментарий')
+        self.assertNotContains(Client().get(detail), 'Отложенный комментарий')
+
+        self.assertEqual(writebehind.drain(), (1, 1))
+        self.assertEqual(self.post.comments.get().text,
+                         'Отложенный комментарий')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_group_commit_batches(self):
+        for num in range(5):
+            self.client.post(
+                reverse('posts:add_comment', args=[self.post.pk]),
+                {'text': f'Комментарий {num}'}
+            )
+        self.assertEqual(writebehind.drain(batch_size=3), (3, 3))
+        self.assertEqual(writebehind.drain(batch_size=3), (2, 2))
+        self.assertEqual(writebehind.drain(batch_size=3), (0, 0))
+        self.assertEqual(Comment.objects.count(), 5)
+
+    def test_claimed_entry_is_not_applied_twice(self):
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Один раз'}
+        )
+        journal = writebehind._connection()
+        entries = journal.execute(
+            'SELECT id, kind, author_id, post_id, payload, created, state '
+            'FROM entries'
+        ).fetchall()
+        # Обработчик применил пачку и упал, не успев удалить её.
+        writebehind._apply(entries)
+        journal.execute(
+            'UPDATE entries SET state = ?', (writebehind.CLAIMED,)
+        )
+        self.assertEqual(writebehind.drain(), (1, 0))
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_comment_to_deleted_post_is_dropped(self):
+        post = Post.objects.create(author=self.user, text='Удалится')
+        self.client.post(
+            reverse('posts:add_comment', args=[post.pk]), {'text': 'Текст'}
+        )
+        post.delete()
+        self.assertEqual(writebehind.drain(), (1, 0))
+        self.assertEqual(writebehind.backlog(), 0)
+
+    def test_deleted_author_does_not_block_queue(self):
+        other = User.objects.create_user(username='other')
+        writebehind._enqueue(
+            writebehind.POST, other.pk,
+            {'text': 'Пост удалённого', 'group_id': None, 'image': ''}
+        )
+        other.delete()
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Обычный пост'}
+        )
+        self.assertEqual(writebehind.drain(), (2, 1))
+        self.assertTrue(Post.objects.filter(text='Обычный пост').exists())
+        self.assertEqual(writebehind.backlog(), 0)
+
+    def test_broken_entry_goes_to_failed(self):
+        writebehind._enqueue(writebehind.POST, self.user.pk, {'text': 'Без'})
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'}
+        )
+        with self.assertLogs('posts.writebehind', 'ERROR'):
+            self.assertEqual(writebehind.drain(), (2, 1))
+        self.assertEqual(writebehind.backlog(), 0)
+        self.assertEqual(writebehind.failed(), 1)
+        self.assertEqual(writebehind.drain(), (0, 0))
+        self.assertEqual(Comment.objects.count(), 1)
@@ -0,0 +1,237 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+Шаблоны не должны ресайзить картинку в запросе: бэкенд sorl-thumbnail
+отдаёт готовую миниатюру из key-value store, а если её ещё нет — ставит
+генерацию в пул потоков и пока возвращает исходную картинку.
+Генерация запускается после сохранения поста с картинкой. Готовая
+миниатюра меняет версии постов с этой картинкой: закэшированные до неё
+карточки и страницы ссылаются на исходный файл.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import versions
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Все геометрии, которые используют теги {% thumbnail %} в шаблонах.
+GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_local = threading.local()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.THUMBNAIL_WORKERS,
+                    thread_name_prefix='thumbnails',
+                )
+    return _executor
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд, который не создаёт миниатюры в потоке запроса."""
+
+    def _full_options(self, source, options):
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def thumbnail_file(self, source, geometry_string, options):
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self._full_options(source, options)
+        )
+        return ImageFile(name, default.storage)
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if getattr(_local, 'generating', False) or (
+            not settings.THUMBNAIL_PREGENERATE
+        ):
+            return super().get_thumbnail(file_, geometry_string, **options)
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        cached = default.kvstore.get(
+            self.thumbnail_file(source, geometry_string, options)
+        )
+        if cached:
+            return cached
+        schedule(source.name, geometry_string, options)
+        return source
+
+
+def prefetch(files):
+    """Читает записи key-value store для миниатюр одним запросом.
+
+    Без этого на холодном кэше каждая карточка поста делает свой
+    SELECT в thumbnail_kvstore.
+    """
+    kvstore = default.kvstore
+    backend = default.backend
+    if not isinstance(kvstore, cached_db_kvstore.KVStore) or not isinstance(
+        backend, PregeneratedThumbnailBackend
+    ):
+        return
+    keys = set()
+    for file_ in files:
+        if not file_:
+            continue
+        source = ImageFile(file_)
+        for geometry_string, options in GEOMETRIES:
+            thumbnail = backend.thumbnail_file(
+                source, geometry_string, options
+            )
+            keys.add(add_prefix(thumbnail.key))
+    if not keys:
+        return
+    missing = keys - set(kvstore.cache.get_many(keys))
+    if not missing:
+        return
+    found = dict(
+        KVStoreModel.objects.filter(key__in=missing).values_list(
+            'key', 'value'
+        )
+    )
+    empty = cached_db_kvstore.EMPTY_VALUE
+    kvstore.cache.set_many(
+        {key: found.get(key, empty) for key in missing},
+        thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+    )
+
+
+def _expire_posts(name):
+    keys = set()
+    for post in Post.objects.filter(image=name).only('author', 'group'):
+        keys.add(versions.post_key(post.pk))
+        keys.update(versions.post_feeds(post, post.group_id))
+    if keys:
+        versions.bump(*keys)
+
+
+def generate(name, geometry_string, options):
+    """Создаёт миниатюру синхронно и записывает её в key-value store."""
+    _local.generating = True
+    try:
+        if not default.storage.exists(name):
+            return None
+        thumbnail = default.backend.get_thumbnail(
+            name, geometry_string, **options
+        )
+    finally:
+        _local.generating = False
+    _expire_posts(name)
+    return thumbnail
+
+
+def _run(key, name, geometry_string, options, background=True):
+    try:
+        generate(name, geometry_string, options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+    finally:
+        _pending.discard(key)
+        if background:
+            close_old_connections()
+
+
+def _submit(key, name, geometry_string, options):
+    if key in _pending:
+        return
+    _pending.add(key)
+    if not settings.THUMBNAIL_WORKERS:
+        _run(key, name, geometry_string, options, background=False)
+        return
+    _get_executor().submit(_run, key, name, geometry_string, options)
+
+
+def schedule(name, geometry_string, options):
+    """Ставит миниатюру в очередь пула после коммита транзакции.
+
+    Ключ попадает в _pending только после коммита: при откате колбэк не
+    вызовется, и ключ не заблокирует миниатюру до конца процесса. При
+    THUMBNAIL_WORKERS = 0 миниатюра создаётся после коммита в том же
+    потоке.
+    """
+    key = (name, geometry_string, tuple(sorted(options.items())))
+    transaction.on_commit(
+        lambda: _submit(key, name, geometry_string, options)
+    )
+
+
+def schedule_all(name):
+    for geometry_string, options in GEOMETRIES:
+        schedule(name, geometry_string, options)
+
+
+def generate_all(name):
+    return [
+        generate(name, geometry_string, options)
+        for geometry_string, options in GEOMETRIES
+    ]
+
+
+def cleanup_orphans(source_names):
+    """Удаляет миниатюры картинок, которых нет на диске или среди постов.
+
+    Затем удаляет файлы миниатюр, на которые не ссылается key-value store.
+    Возвращает число удалённых файлов.
+    """
+    kvstore = default.kvstore
+    kvstore.cleanup()
+    source_names = set(source_names)
+    referenced = set()
+    for key in list(kvstore._find_keys(identity='thumbnails')):
+        source = kvstore._get(key)
+        if source is None:
+            continue
+        if source.name not in source_names:
+            kvstore.delete(source)
+            continue
+        for thumbnail_key in kvstore._get(key, identity='thumbnails') or []:
+            thumbnail = kvstore._get(thumbnail_key)
+            if thumbnail is not None:
+                referenced.add(thumbnail.name)
+    removed = 0
+    for name in _walk(default.storage, thumbnail_settings.THUMBNAIL_PREFIX):
+        if name not in referenced:
+            default.storage.delete(name)
+            removed += 1
+    return removed
+
+
+def _walk(storage, path):
+    if not storage.exists(path):
+        return
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield f'{path.rstrip("/")}/{name}'
+    for directory in directories:
+        yield from _walk(storage, f'{path.rstrip("/")}/{directory}')
@@ -0,0 +1,285 @@
+"""Materialized-лента подписок (fan-out on write).
+
+Новый пост раскладывается по лентам подписчиков автора в FeedEntry,
+поэтому страница /follow/ читается одним диапазоном по индексу
+(user, pub_date, post). Авторы, у которых подписчиков больше
+FEED_FANOUT_MAX_FOLLOWERS, не раскладываются: их посты подмешиваются
+в ленту при чтении (fan-out on read).
+
+Статус автора хранится в Profile.celebrity и меняется только при
+подписке и отписке. Пока автор не раскладывается, его новые посты и
+новые подписки не попадают в FeedEntry, поэтому при возврате к
+раскладке (подписчиков меньше FEED_FANOUT_MIN_FOLLOWERS) его посты
+копируются в ленты всех подписчиков в фоновом потоке.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+
+from . import graph
+from .models import FeedEntry, Follow, Post, Profile
+
+logger = logging.getLogger(__name__)
+
+CELEBRITIES_KEY = 'timeline:celebrities'
+BATCH_SIZE = 1000
+# Сколько id авторов подставлять в IN (...) вместо join с Follow:
+# у SQLite ограничено число параметров запроса.
+MAX_INLINE_AUTHORS = 500
+
+_executor = None
+_executor_lock = threading.Lock()
+_demoting = set()
+
+
+def enabled():
+    return settings.FEED_FANOUT_ENABLED
+
+
+def celebrity_ids():
+    """Авторы, чьи посты не раскладываются по лентам."""
+    celebrities = cache.get(CELEBRITIES_KEY)
+    if celebrities is None:
+        celebrities = frozenset(Profile.objects.filter(
+            celebrity=True
+        ).values_list('user_id', flat=True))
+        cache.set(
+            CELEBRITIES_KEY, celebrities, settings.FEED_CELEBRITIES_TIMEOUT
+        )
+    return celebrities
+
+
+def is_celebrity(author_id):
+    return author_id in celebrity_ids()
+
+
+def _forget_celebrities():
+    cache.delete(CELEBRITIES_KEY)
+    # До коммита другой процесс мог прочитать из базы старые флаги.
+    transaction.on_commit(lambda: cache.delete(CELEBRITIES_KEY))
+
+
+def _update_celebrity(author_id):
+    """Переключает автора между раскладкой и чтением по числу подписчиков.
+
+    Между FEED_FANOUT_MIN_FOLLOWERS и FEED_FANOUT_MAX_FOLLOWERS статус не
+    меняется. Возврат к раскладке копирует посты автора во все ленты,
+    поэтому идёт не в запросе, а после коммита в фоне (demote).
+    """
+    followers = graph.follower_count(author_id)
+    if is_celebrity(author_id):
+        if followers < settings.FEED_FANOUT_MIN_FOLLOWERS:
+            transaction.on_commit(lambda: _schedule_demotion(author_id))
+        return
+    if followers > settings.FEED_FANOUT_MAX_FOLLOWERS:
+        Profile.objects.update_or_create(
+            user_id=author_id, defaults={'celebrity': True}
+        )
+        _forget_celebrities()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.FEED_BACKFILL_WORKERS,
+                    thread_name_prefix='timeline',
+                )
+    return _executor
+
+
+def _run_demotion(author_id, background=True):
+    try:
+        demote(author_id)
+    except Exception:
+        logger.exception('Не удалось вернуть автора %s к раскладке', author_id)
+    finally:
+        _demoting.discard(author_id)
+        if background:
+            close_old_connections()
+
+
+def _schedule_demotion(author_id):
+    if author_id in _demoting:
+        return
+    _demoting.add(author_id)
+    if not settings.FEED_BACKFILL_WORKERS:
+        _run_demotion(author_id, background=False)
+        return
+    _get_executor().submit(_run_demotion, author_id)
+
+
+def _copy_to_followers(author_id):
+    for user_id in Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).iterator():
+        _copy_author_posts(user_id, author_id)
+
+
+def demote(author_id):
+    """Возвращает автора к раскладке постов по лентам подписчиков.
+
+    Пока посты копируются, автор остаётся celebrity и читается при
+    запросе. Второй проход после снятия флага докладывает посты и
+    подписки, появившиеся за время копирования, а записи отписавшихся
+    за это время удаляются.
+    """
+    followers = Follow.objects.filter(author_id=author_id)
+    if followers.count() >= settings.FEED_FANOUT_MIN_FOLLOWERS:
+        return
+    _copy_to_followers(author_id)
+    with transaction.atomic():
+        Profile.objects.filter(user_id=author_id).update(celebrity=False)
+        _forget_celebrities()
+    _copy_to_followers(author_id)
+    FeedEntry.objects.filter(author_id=author_id).exclude(
+        user__in=followers.values('user')
+    ).delete()
+
+
+def _sync_celebrities():
+    followers = Follow.objects.values('author').annotate(
+        followers=Count('id')
+    )
+    celebrities = followers.filter(
+        followers__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values('author')
+    keep = followers.filter(
+        followers__gte=settings.FEED_FANOUT_MIN_FOLLOWERS
+    ).values('author')
+    Profile.objects.filter(user__in=celebrities).update(celebrity=True)
+    Profile.objects.exclude(user__in=keep).update(celebrity=False)
+    _forget_celebrities()
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    fan_out_posts([post])
+
+
+def fan_out_posts(posts):
+    """То же для пачки постов: подписчики читаются раз на автора."""
+    if not enabled():
+        return
+    by_author = {}
+    for post in posts:
+        if not is_celebrity(post.author_id):
+            by_author.setdefault(post.author_id, []).append(post)
+    for author_id, author_posts in by_author.items():
+        # Записи ленты строятся по базе, а не по графу в кэше: устаревший
+        # кэш не должен попасть в FeedEntry.
+        follower_ids = list(Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True))
+        _bulk_insert(
+            FeedEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=author_id,
+                pub_date=post.pub_date,
+            )
+            for post in author_posts
+            for user_id in follower_ids
+        )
+
+
+def _copy_author_posts(user_id, author_id):
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    _bulk_insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def add_author(user_id, author_id):
+    """Копирует посты автора в ленту нового подписчика."""
+    if not enabled():
+        return
+    _update_celebrity(author_id)
+    if not is_celebrity(author_id):
+        _copy_author_posts(user_id, author_id)
+
+
+def remove_author(user_id, author_id):
+    if not enabled():
+        return
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    _update_celebrity(author_id)
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты целиком; возвращает число записей.
+
+    Полная пересборка заодно пересчитывает Profile.celebrity.
+    """
+    entries = FeedEntry.objects.all()
+    follows = Follow.objects.order_by('user_id', 'author_id')
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+    else:
+        _sync_celebrities()
+    entries.delete()
+    celebrities = celebrity_ids()
+    for user_id, author_id in follows.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        if author_id not in celebrities:
+            _copy_author_posts(user_id, author_id)
+    if user_ids is not None:
+        return FeedEntry.objects.filter(user_id__in=user_ids).count()
+    return FeedEntry.objects.count()
+
+
+def follow_feed(user):
+    """Queryset ленты подписок, упорядоченный по (feed_date, pk)."""
+    following = graph.following(user.pk)
+    if not enabled():
+        if len(following) > MAX_INLINE_AUTHORS:
+            authors = Q(author__following__user=user)
+        else:
+            authors = Q(author_id__in=list(following))
+        return Post.objects.filter(authors).annotate(
+            feed_date=F('pub_date')
+        ).order_by('-feed_date', '-pk')
+    celebrities = celebrity_ids()
+    followed_celebrities = [
+        author_id for author_id in following if author_id in celebrities
+    ]
+    if followed_celebrities:
+        return Post.objects.filter(
+            Q(feed_entries__user=user)
+            | Q(author_id__in=followed_celebrities)
+        ).annotate(
+            feed_date=F('pub_date')
+        ).distinct().order_by('-feed_date', '-pk')
+    return Post.objects.filter(
+        feed_entries__user=user
+    ).annotate(
+        feed_date=F('feed_entries__pub_date')
+    ).order_by('-feed_date', '-pk')
@@ -0,0 +1,378 @@
+"""Потоковые выгрузка и загрузка пользователей, групп, постов,
+комментариев и подписок в NDJSON или CSV (по желанию сжатых gzip).
+
+Каждая модель пишется в свой файл <имя>.<формат>[.gz] в каталоге.
+Строки читаются через .iterator() и обрабатываются кусками, поэтому
+память не растёт с размером данных.
+
+При загрузке новые id назначаются заранее: база модели (max(pk) + 1)
+плюс номер строки в файле. Соответствие старых id новым хранится во
+временной базе SQLite рядом с файлами вместе с числом уже загруженных
+строк. Повторный запуск пропускает загруженное, а недописанный кусок
+вставляется ещё раз с ignore_conflicts и теми же id, так что дублей
+не будет. Пользователи сопоставляются по username, группы по slug.
+
+Если между запусками или во время загрузки в базу пишут, выбранный id
+может оказаться занят чужой строкой, и ignore_conflicts её молча
+пропустит. Поэтому после каждого куска строки под назначенными id
+сверяются с загружаемыми: для чужих ищется копия от прошлого запуска
+или назначается свободный id, а база сдвигается за max(pk).
+"""
+import csv
+import gzip
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+from .seeding import next_id
+
+FORMATS = ('ndjson', 'csv')
+# Сколько раз искать свободные id для строк, чьи id заняты.
+CLAIM_ATTEMPTS = 5
+
+
+class Spec:
+    def __init__(self, name, model, fields, foreign_keys=None,
+                 natural_key=None, dates=()):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.foreign_keys = foreign_keys or {}
+        self.natural_key = natural_key
+        self.dates = dates
+
+
+SPECS = (
+    Spec('users', User, (
+        'id', 'username', 'password', 'first_name', 'last_name', 'email',
+        'is_staff', 'is_active', 'is_superuser', 'date_joined',
+        'last_login',
+    ), natural_key='username', dates=('date_joined', 'last_login')),
+    Spec('groups', Group, ('id', 'title', 'slug', 'description'),
+         natural_key='slug'),
+    Spec('posts', Post, (
+        'id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+    ), foreign_keys={'author_id': 'users', 'group_id': 'groups'},
+        dates=('pub_date',)),
+    Spec('comments', Comment, (
+        'id', 'text', 'created', 'author_id', 'post_id',
+    ), foreign_keys={'author_id': 'users', 'post_id': 'posts'},
+        dates=('created',)),
+    Spec('follows', Follow, ('user_id', 'author_id'),
+         foreign_keys={'user_id': 'users', 'author_id': 'users'}),
+)
+
+BOOLEAN_FIELDS = {'is_staff', 'is_active', 'is_superuser'}
+
+
+def file_path(directory, spec, fmt, compress):
+    name = f'{spec.name}.{fmt}'
+    return os.path.join(directory, name + '.gz' if compress else name)
+
+
+def open_text(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export(directory, fmt='ndjson', compress=False, chunk_size=2000):
+    """Выгружает все модели; возвращает {имя: число строк}."""
+    os.makedirs(directory, exist_ok=True)
+    totals = {}
+    for spec in SPECS:
+        rows = spec.model.objects.order_by('pk').values_list(
+            *spec.fields
+        ).iterator(chunk_size=chunk_size)
+        count = 0
+        with open_text(file_path(directory, spec, fmt, compress), 'w') as out:
+            if fmt == 'csv':
+                writer = csv.writer(out)
+                writer.writerow(spec.fields)
+            for row in rows:
+                row = [_plain(value) for value in row]
+                if fmt == 'csv':
+                    writer.writerow(['' if value is None else value
+                                     for value in row])
+                else:
+                    out.write(json.dumps(
+                        dict(zip(spec.fields, row)), ensure_ascii=False,
+                        separators=(',', ':')
+                    ))
+                    out.write('\n')
+                count += 1
+        totals[spec.name] = count
+    return totals
+
+
+def find_file(directory, spec):
+    for fmt in FORMATS:
+        for compress in (False, True):
+            path = file_path(directory, spec, fmt, compress)
+            if os.path.exists(path):
+                return path, fmt
+    return None, None
+
+
+def read_rows(path, fmt, spec):
+    """Строки файла как словари; значения приведены к типам полей."""
+    with open_text(path, 'r') as source:
+        if fmt == 'csv':
+            records = csv.DictReader(source)
+        else:
+            records = (json.loads(line) for line in source if line.strip())
+        for record in records:
+            yield _typed(record, spec, fmt)
+
+
+def _typed(record, spec, fmt):
+    row = {}
+    for field in spec.fields:
+        value = record.get(field)
+        if fmt == 'csv':
+            if value == '' and (
+                field in spec.dates or field in spec.foreign_keys
+            ):
+                value = None
+            elif field in BOOLEAN_FIELDS:
+                value = value == 'True'
+        if value is not None and field in spec.dates:
+            value = parse_datetime(value)
+        if value is not None and (
+            field == 'id' or field in spec.foreign_keys
+        ):
+            value = int(value)
+        row[field] = value
+    return row
+
+
+@contextmanager
+def keep_dates(model):
+    """Отключает auto_now_add, чтобы даты из выгрузки не заменялись."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class ImportState:
+    """Соответствие id и прогресс загрузки во временной базе SQLite."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            'CREATE TABLE IF NOT EXISTS ids ('
+            'model TEXT, old INTEGER, new INTEGER, '
+            'PRIMARY KEY (model, old)) WITHOUT ROWID;'
+            'CREATE TABLE IF NOT EXISTS progress ('
+            'model TEXT PRIMARY KEY, base INTEGER, done INTEGER);'
+        )
+
+    def progress(self, model_name, default_base):
+        row = self.connection.execute(
+            'SELECT base, done FROM progress WHERE model = ?',
+            (model_name,)
+        ).fetchone()
+        if row is None:
+            self.connection.execute(
+                'INSERT INTO progress VALUES (?, ?, 0)',
+                (model_name, default_base)
+            )
+            self.connection.commit()
+            return default_base, 0
+        return row
+
+    def lookup(self, model_name, old_ids):
+        old_ids = list(set(old_ids))
+        found = {}
+        # Ограничение SQLite на число параметров запроса.
+        for start in range(0, len(old_ids), 500):
+            part = old_ids[start:start + 500]
+            found.update(self.connection.execute(
+                f'SELECT old, new FROM ids WHERE model = ? '
+                f'AND old IN ({",".join("?" * len(part))})',
+                (model_name, *part)
+            ))
+        return found
+
+    def save(self, model_name, mapping, done, base):
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO ids VALUES (?, ?, ?)',
+            [(model_name, old, new) for old, new in mapping.items()]
+        )
+        self.connection.execute(
+            'UPDATE progress SET done = ?, base = ? WHERE model = ?',
+            (done, base, model_name)
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class Importer:
+    def __init__(self, directory, state_path=None, batch_size=1000,
+                 restart=False):
+        self.directory = directory
+        self.batch_size = batch_size
+        state_path = state_path or os.path.join(
+            directory, '.import-state.sqlite3'
+        )
+        if restart and os.path.exists(state_path):
+            os.remove(state_path)
+        self.state = ImportState(state_path)
+
+    def run(self, progress=None):
+        """Загружает все найденные файлы; возвращает {имя: строк}."""
+        totals = {}
+        try:
+            for spec in SPECS:
+                path, fmt = find_file(self.directory, spec)
+                if path is not None:
+                    totals[spec.name] = self.load(spec, path, fmt, progress)
+        finally:
+            self.state.close()
+        return totals
+
+    def load(self, spec, path, fmt, progress=None):
+        base, done = self.state.progress(spec.name, next_id(spec.model))
+        batch = []
+        line = 0
+        for row in read_rows(path, fmt, spec):
+            line += 1
+            if line <= done:
+                continue
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                base = self._insert(spec, base, batch)
+                if progress:
+                    progress(spec.name, line)
+                batch = []
+        if batch:
+            self._insert(spec, base, batch)
+        if progress:
+            progress(spec.name, line)
+        return line
+
+    def _remap(self, spec, rows):
+        for field, target in spec.foreign_keys.items():
+            mapping = self.state.lookup(
+                target, [row[field] for row in rows if row[field]]
+            )
+            for row in rows:
+                if row[field] is not None:
+                    row[field] = mapping.get(row[field])
+
+    def _existing(self, spec, rows):
+        """id уже существующих объектов с тем же естественным ключом."""
+        if spec.natural_key is None:
+            return {}
+        return dict(spec.model.objects.filter(**{
+            f'{spec.natural_key}__in': [row[spec.natural_key] for row in rows]
+        }).values_list(spec.natural_key, 'pk'))
+
+    def _insert(self, spec, base, batch):
+        """Вставляет кусок; возвращает базу id для следующих кусков."""
+        rows = [row for _, row in batch]
+        self._remap(spec, rows)
+        existing = self._existing(spec, rows)
+        mapping = {}
+        planned = {}
+        objects = []
+        for line, row in batch:
+            old_id = row.pop('id', None)
+            if spec.natural_key and row[spec.natural_key] in existing:
+                mapping[old_id] = existing[row[spec.natural_key]]
+                continue
+            if any(row[field] is None for field in spec.foreign_keys
+                   if not spec.model._meta.get_field(field).null):
+                # Ссылка на объект, которого нет в выгрузке.
+                continue
+            if old_id is None:
+                # Подписки ни на что не ссылаются: свои id им не нужны.
+                objects.append(spec.model(**row))
+                continue
+            planned[old_id] = (base + line - 1, row)
+        with transaction.atomic(), keep_dates(spec.model):
+            spec.model.objects.bulk_create(
+                objects + [
+                    spec.model(pk=pk, **row) for pk, row in planned.values()
+                ],
+                ignore_conflicts=True
+            )
+            claimed = self._claim(spec, planned)
+        mapping.update(claimed)
+        done = batch[-1][0]
+        if any(claimed[old_id] != pk for old_id, (pk, _) in planned.items()):
+            # Диапазон id занят чужими строками: дальше — за max(pk).
+            base = next_id(spec.model) - done
+        self.state.save(spec.name, mapping, done, base)
+        return base
+
+    def _claim(self, spec, planned):
+        """Сверяет строки под назначенными id с загружаемыми.
+
+        Возвращает {старый id: новый}. Строке, чей id занят чужой
+        строкой, достаётся её копия от прошлого запуска или свободный id.
+        """
+        fields = [field for field in spec.fields if field != 'id']
+        mapping = {}
+        for _ in range(CLAIM_ATTEMPTS):
+            if not planned:
+                return mapping
+            stored = {
+                values[0]: values[1:]
+                for values in spec.model.objects.filter(
+                    pk__in=[pk for pk, _ in planned.values()]
+                ).values_list('pk', *fields)
+            }
+            taken = []
+            for old_id, (pk, row) in planned.items():
+                if stored.get(pk) == tuple(row[field] for field in fields):
+                    mapping[old_id] = pk
+                    continue
+                # Объект с тем же естественным ключом мог появиться
+                # в базе во время загрузки: вставка всё равно не пройдёт.
+                lookup = row
+                if spec.natural_key:
+                    lookup = {spec.natural_key: row[spec.natural_key]}
+                copy = spec.model.objects.filter(**lookup).values_list(
+                    'pk', flat=True
+                ).first()
+                if copy is not None:
+                    mapping[old_id] = copy
+                else:
+                    taken.append((old_id, row))
+            start = next_id(spec.model)
+            planned = {
+                old_id: (start + index, row)
+                for index, (old_id, row) in enumerate(taken)
+            }
+            spec.model.objects.bulk_create(
+                [spec.model(pk=pk, **row) for pk, row in planned.values()],
+                ignore_conflicts=True
+            )
+        if planned:
+            raise RuntimeError(
+                f'{spec.name}: не удалось подобрать свободные id'
+            )
+        return mapping
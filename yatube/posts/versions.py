@@ -0,0 +1,120 @@
+"""Версии объектов для ключей кэша фрагментов.
+
+Версия — случайная метка в кэше. Сигналы меняют метку при изменении
+поста, комментария, группы или автора, и все фрагменты, в ключ которых
+входила старая метка, перестают находиться. Пропавшая из кэша версия
+заменяется новой меткой, а не значением по умолчанию, поэтому
+устаревший фрагмент никогда не вернётся.
+
+Метки и фрагменты живут VERSION_TIMEOUT и FRAGMENT_CACHE_TIMEOUT:
+фрагменты под сменёнными метками больше никто не читает, и в общем
+кэше (Redis) они должны истечь сами.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import counts
+
+FEEDS = 'feeds'
+
+
+def post_key(post_id):
+    return f'version:post:{post_id}'
+
+
+def group_key(group_id):
+    return f'version:group:{group_id}'
+
+
+def author_key(author_id):
+    return f'version:author:{author_id}'
+
+
+def follows_key(user_id):
+    """Версия подписок пользователя: меняется при подписке и отписке."""
+    return f'version:follows:{user_id}'
+
+
+def followers_key(user_id):
+    """Версия подписчиков: меняется, когда на пользователя подписываются."""
+    return f'version:followers:{user_id}'
+
+
+def feed_key(feed):
+    return f'version:feed:{feed}'
+
+
+def _token():
+    return uuid.uuid4().hex[:12]
+
+
+def now_and_on_commit(func):
+    """Выполняет func сейчас и, если идёт транзакция, ещё раз после коммита.
+
+    Пока транзакция не закоммичена, другой запрос может взять уже новую
+    версию, но прочитать из базы старые данные и сохранить фрагмент под
+    ней. Повтор после коммита делает такой фрагмент недостижимым.
+    """
+    func()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(func)
+
+
+def get_many(keys):
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _token(), settings.VERSION_TIMEOUT)
+            found[key] = cache.get(key)
+    return found
+
+
+def get(key):
+    return get_many([key])[key]
+
+
+def bump(*keys):
+    def set_tokens():
+        cache.set_many(
+            {key: _token() for key in keys}, settings.VERSION_TIMEOUT
+        )
+    now_and_on_commit(set_tokens)
+
+
+def feed_version(feed):
+    """Версия ленты: меняется с любым постом ленты и с FEEDS."""
+    keys = [feed_key(FEEDS), feed_key(feed)]
+    found = get_many(keys)
+    return '-'.join(found[key] for key in keys)
+
+
+def post_feeds(post, group_id):
+    feeds = [
+        feed_key(counts.ALL_POSTS),
+        feed_key(counts.author_feed(post.author_id)),
+    ]
+    if group_id is not None:
+        feeds.append(feed_key(counts.group_feed(group_id)))
+    return feeds
+
+
+def attach_card_versions(posts):
+    """Проставляет post.card_version одним запросом к кэшу."""
+    posts = list(posts)
+    keys = set()
+    for post in posts:
+        keys.update(_card_keys(post))
+    found = get_many(list(keys))
+    for post in posts:
+        post.card_version = '-'.join(found[key] for key in _card_keys(post))
+    return posts
+
+
+def _card_keys(post):
+    keys = [post_key(post.pk), author_key(post.author_id)]
+    if post.group_id is not None:
+        keys.append(group_key(post.group_id))
+    return keys
@@ -1,57 +1,151 @@
+from django.conf import settings
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, render
-from . models import Group, Post, User, Follow
+from django.utils.functional import SimpleLazyObject
+from . models import Comment, Group, Post, User, Follow
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import condition
 from django.shortcuts import redirect
-from . forms import PostForm, CommentForm
-from posts . paginators import paginate_page
+from . forms import PostForm, CommentForm, SearchForm
+from posts . paginators import KeysetPaginator, paginate_page
+from core.db.routers import replica_reads
+from . import (
+    conditional, counts, holes, search, timeline, writebehind
+)
 
 
+@replica_reads
+@condition(etag_func=conditional.index_etag)
+@holes.page_cache(conditional.index_version)
 def index(request):
     posts = Post.objects.select_related("group", "author")
-    paagination_data = paginate_page(request, posts)
+    paagination_data = paginate_page(request, posts, counts.ALL_POSTS)
     return render(
-        request, "posts/index.html", {**paagination_data})
+        request, "posts/index.html",
+        {'feed': counts.ALL_POSTS, **paagination_data})
 
 
+@replica_reads
+@condition(etag_func=conditional.group_etag)
+@holes.page_cache(conditional.group_version)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all().select_related('author')
-    paagination_data = paginate_page(request, posts)
+    posts = group.posts.all().select_related('author', 'group')
+    paagination_data = paginate_page(
+        request, posts, counts.group_feed(group.pk)
+    )
     context = {
         'group': group,
         'posts': posts,
+        'feed': counts.group_feed(group.pk),
         **paagination_data
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@condition(etag_func=conditional.profile_etag)
+@holes.page_cache(conditional.profile_version)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paagination_data = paginate_page(request, post_list)
-    following = False
-    if request.user.is_authenticated:
-        following = request.user.follower.filter(author=author).exists()
+    # Счётчики постов и подписок — в Profile, тем же запросом.
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    post_list = author.posts.select_related('author', 'group')
+    paagination_data = paginate_page(
+        request, post_list, counts.author_feed(author.pk)
+    )
+    pending_posts = []
+    if request.user == author:
+        pending_posts = writebehind.pending_posts(author)
     context = {
         'author': author,
-        'following': following,
+        # Подписка — из графа в кэше, без запроса к Follow.
+        **holes.follow_button(request, author.username, author.pk),
+        'pending_posts': pending_posts,
+        'feed': counts.author_feed(author.pk),
         **paagination_data
     }
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@condition(etag_func=conditional.post_detail_etag)
+@holes.page_cache(conditional.post_detail_version)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), pk=post_id
+    )
+    conditional.remember_post_author(post)
+    # Первая страница комментариев; выбирается, только если фрагмент
+    # комментариев не нашёлся в кэше.
+    comments = SimpleLazyObject(
+        lambda: comment_paginator(post.pk).first_page()
+    )
     form = CommentForm()
     context = {
         'post': post,
         'comments': comments,
+        'pending_comments': writebehind.pending_comments(
+            post.pk, request.user
+        ),
         'form': form
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comment_paginator(post_id):
+    return KeysetPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENT_LIMIT, keys=('created', 'pk'), descending=False
+    )
+
+
+@replica_reads
+def post_comments(request, post_id):
+    """Следующие страницы комментариев: фрагмент HTML или JSON."""
+    page = comment_paginator(post_id).get_page(request.GET.get('cursor'))
+    if not len(page) and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in page
+            ],
+            'next_cursor': page.next_cursor,
+        })
+    return render(request, 'posts/includes/comments.html', {
+        'comments': page, 'post_id': post_id
+    })
+
+
+def post_search(request):
+    form = SearchForm(request.GET or None)
+    context = {'form': form}
+    if form.is_valid():
+        author = None
+        username = form.cleaned_data['author']
+        if username:
+            author = get_object_or_404(User, username=username)
+        posts = search.search(
+            form.cleaned_data['q'], form.cleaned_data['group'], author
+        ).select_related('author', 'group')
+        params = request.GET.copy()
+        params.pop('page', None)
+        params.pop('cursor', None)
+        context.update(
+            query_string=params.urlencode() + '&',
+            **paginate_page(request, posts, keys=('score', 'pk'))
+        )
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -60,6 +154,9 @@ def post_create(request):
     )
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
+    if writebehind.enabled():
+        writebehind.enqueue_post(request.user, form)
+        return redirect('posts:profile', request.user)
     temp_form = form.save(commit=False)
     temp_form.author = request.user
     temp_form.save()
@@ -96,6 +193,11 @@ def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     if not form.is_valid():
         return render(request, 'posts:post_detail', post_id=post_id)
+    if writebehind.enabled():
+        writebehind.enqueue_comment(
+            request.user, get_object_or_404(Post, pk=post_id), form
+        )
+        return redirect('posts:post_detail', post_id=post_id)
     comment = form.save(commit=False)
     comment.author = request.user
     comment.post = get_object_or_404(Post, pk=post_id)
@@ -104,10 +206,16 @@ def add_comment(request, post_id):
 
 
 @login_required
+@condition(etag_func=conditional.follow_etag)
 def follow_index(request):
     title = 'Публикации отслеживаемых авторов'
-    posts = Post.objects.filter(author__following__user=request.user)
-    paagination_data = paginate_page(request, posts)
+    posts = timeline.follow_feed(request.user).select_related(
+        'author', 'group'
+    )
+    paagination_data = paginate_page(
+        request, posts, counts.follow_feed(request.user.pk),
+        keys=('feed_date', 'pk')
+    )
     context = {
         'title': title,
         **paagination_data
@@ -118,10 +226,8 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     follow_author = get_object_or_404(User, username=username)
-    if follow_author != request.user and (
-        not request.user.follower.filter(author=follow_author).exists()
-    ):
-        Follow.objects.create(
+    if follow_author != request.user:
+        Follow.objects.get_or_create(
             user=request.user,
             author=follow_author
         )
@@ -131,7 +237,5 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     follow_author = get_object_or_404(User, username=username)
-    data_follow = request.user.follower.filter(author=follow_author)
-    if data_follow.exists():
-        data_follow.delete()
+    request.user.follower.filter(author=follow_author).delete()
     return redirect('posts:profile', username)
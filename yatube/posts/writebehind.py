@@ -0,0 +1,309 @@
+"""Отложенная запись постов и комментариев (write-behind).
+
+При WRITE_BEHIND представления не пишут в основную базу: проверенные
+данные формы попадают в журнал — отдельный файл SQLite в режиме WAL,
+куда запись занимает доли миллисекунды и не ждёт блокировки основной
+базы. Команда process_write_behind забирает записи пачками и создаёт
+объекты одной транзакцией на пачку, так что сигналы (счётчики, ленты,
+поиск) срабатывают как обычно, а fsync основной базы один на пачку.
+
+Пока запись в журнале, автор видит её на своей странице и странице
+поста (pending_posts, pending_comments).
+
+Запись сначала помечается взятой, затем применяется, затем удаляется
+из журнала. Если обработчик упал между фиксацией транзакции и
+удалением, при следующем проходе взятая запись проверяется по
+содержимому и второй раз не создаётся. Обработчик должен быть один.
+
+Каждая запись применяется в своей точке сохранения. Запись, которая
+упала, переводится в состояние FAILED и больше не берётся, чтобы одна
+плохая запись не держала всю очередь.
+"""
+import json
+import logging
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Group, Post, User
+
+logger = logging.getLogger(__name__)
+
+POST = 'post'
+COMMENT = 'comment'
+
+QUEUED = 0
+CLAIMED = 1
+FAILED = 2
+
+_local = threading.local()
+
+
+def enabled():
+    return settings.WRITE_BEHIND
+
+
+def _connection():
+    path = settings.WRITE_BEHIND_JOURNAL
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    connection = connections.get(path)
+    if connection is None:
+        connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, '
+            'author_id INTEGER NOT NULL, post_id INTEGER, '
+            'payload TEXT NOT NULL, created TEXT NOT NULL, '
+            'state INTEGER NOT NULL DEFAULT 0)'
+        )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS entries_author '
+            'ON entries (author_id, kind)'
+        )
+        connections[path] = connection
+    return connection
+
+
+def close():
+    """Закрывает соединения текущего потока с журналом."""
+    for connection in getattr(_local, 'connections', {}).values():
+        connection.close()
+    _local.connections = {}
+
+
+def _enqueue(kind, author_id, payload, post_id=None):
+    cursor = _connection().execute(
+        'INSERT INTO entries (kind, author_id, post_id, payload, created) '
+        'VALUES (?, ?, ?, ?, ?)',
+        (kind, author_id, post_id, json.dumps(payload, ensure_ascii=False),
+         timezone.now().isoformat())
+    )
+    return cursor.lastrowid
+
+
+def enqueue_post(author, form):
+    """Ставит в очередь пост из проверенной PostForm.
+
+    Картинка сохраняется в хранилище сразу: в журнал попадает имя файла.
+    """
+    data = form.cleaned_data
+    image = ''
+    if data.get('image'):
+        field = Post._meta.get_field('image')
+        image = default_storage.save(
+            field.generate_filename(None, data['image'].name), data['image']
+        )
+    group = data.get('group')
+    return _enqueue(POST, author.pk, {
+        'text': data['text'],
+        'group_id': group.pk if group else None,
+        'image': image,
+    })
+
+
+def enqueue_comment(author, post, form):
+    return _enqueue(
+        COMMENT, author.pk, {'text': form.cleaned_data['text']}, post.pk
+    )
+
+
+def _pending(sql, params, author):
+    items = []
+    for payload, created in _connection().execute(sql, params):
+        item = SimpleNamespace(**json.loads(payload))
+        item.author = author
+        item.created = parse_datetime(created)
+        item.pending = True
+        items.append(item)
+    return items
+
+
+def pending_posts(author):
+    """Посты автора, ещё не записанные в базу, от новых к старым."""
+    if not enabled():
+        return []
+    return _pending(
+        'SELECT payload, created FROM entries '
+        'WHERE author_id = ? AND kind = ? AND state != ? ORDER BY id DESC',
+        (author.pk, POST, FAILED), author
+    )
+
+
+def pending_comments(post_id, author):
+    """Комментарии автора к посту, ещё не записанные в базу."""
+    if not enabled() or not author.is_authenticated:
+        return []
+    return _pending(
+        'SELECT payload, created FROM entries WHERE author_id = ? '
+        'AND kind = ? AND post_id = ? AND state != ? ORDER BY id',
+        (author.pk, COMMENT, post_id, FAILED), author
+    )
+
+
+def last_pending(author, kind):
+    """id последней записи автора в очереди (0 — очередь пуста).
+
+    Часть валидатора ETag: страница автора меняется вместе с очередью.
+    """
+    if not enabled() or not author.is_authenticated:
+        return 0
+    row = _connection().execute(
+        'SELECT MAX(id) FROM entries WHERE author_id = ? AND kind = ?',
+        (author.pk, kind)
+    ).fetchone()
+    return row[0] or 0
+
+
+def backlog():
+    return _connection().execute(
+        'SELECT COUNT(*) FROM entries WHERE state != ?', (FAILED,)
+    ).fetchone()[0]
+
+
+def failed():
+    """Число записей, которые не удалось применить."""
+    return _connection().execute(
+        'SELECT COUNT(*) FROM entries WHERE state = ?', (FAILED,)
+    ).fetchone()[0]
+
+
+def _applied(entry):
+    """Создан ли уже объект записи (проверка после сбоя обработчика)."""
+    _, kind, author_id, post_id, payload, created, _ = entry
+    payload = json.loads(payload)
+    if kind == POST:
+        return Post.objects.filter(
+            author_id=author_id, text=payload['text'],
+            pub_date__gte=parse_datetime(created),
+        ).exists()
+    return Comment.objects.filter(
+        author_id=author_id, post_id=post_id, text=payload['text'],
+        created__gte=parse_datetime(created),
+    ).exists()
+
+
+def _known(entries):
+    """id авторов, групп и постов пачки, которые ещё есть в базе."""
+    author_ids = set()
+    group_ids = set()
+    post_ids = set()
+    for _, kind, author_id, post_id, payload, _, _ in entries:
+        author_ids.add(author_id)
+        if kind == POST:
+            group_ids.add(json.loads(payload).get('group_id'))
+        else:
+            post_ids.add(post_id)
+    # Автора, группу или пост могли удалить, пока запись ждала в очереди.
+    return SimpleNamespace(
+        authors=set(User.objects.filter(
+            pk__in=author_ids
+        ).values_list('pk', flat=True)),
+        groups=set(Group.objects.filter(
+            pk__in=group_ids
+        ).values_list('pk', flat=True)),
+        posts=set(Post.objects.filter(
+            pk__in=post_ids
+        ).values_list('pk', flat=True)),
+    )
+
+
+def _apply_entry(entry, known):
+    """Создаёт объект записи; False — создавать нечего."""
+    _, kind, author_id, post_id, payload, _, state = entry
+    if author_id not in known.authors:
+        return False
+    if state == CLAIMED and _applied(entry):
+        return False
+    payload = json.loads(payload)
+    if kind == POST:
+        if payload['group_id'] not in known.groups:
+            payload['group_id'] = None
+        Post.objects.create(author_id=author_id, **payload)
+        return True
+    if post_id not in known.posts:
+        return False
+    Comment.objects.create(author_id=author_id, post_id=post_id, **payload)
+    return True
+
+
+def _apply_each(entries, known):
+    created = 0
+    failed = []
+    for entry in entries:
+        try:
+            with transaction.atomic():
+                created += _apply_entry(entry, known)
+        except Exception:
+            logger.exception('Запись журнала %s не применена', entry[0])
+            failed.append(entry[0])
+    return created, failed
+
+
+def _apply(entries):
+    """Применяет пачку; возвращает (создано, id упавших записей)."""
+    known = _known(entries)
+    try:
+        with transaction.atomic():
+            return _apply_each(entries, known)
+    except DatabaseError:
+        # Отложенные проверки (внешние ключи SQLite) падают только на
+        # коммите всей пачки: тогда каждая запись идёт своей транзакцией.
+        logger.exception('Пачка журнала не записана, записи по одной')
+    created = 0
+    failed = []
+    for entry in entries:
+        try:
+            with transaction.atomic():
+                done, failures = _apply_each([entry], known)
+        except DatabaseError:
+            logger.exception('Запись журнала %s не применена', entry[0])
+            done, failures = 0, [entry[0]]
+        created += done
+        failed += failures
+    return created, failed
+
+
+def drain(batch_size=None):
+    """Записывает в базу одну пачку; возвращает (взято, создано).
+
+    Упавшие записи остаются в журнале в состоянии FAILED.
+    """
+    batch_size = batch_size or settings.WRITE_BEHIND_BATCH
+    journal = _connection()
+    entries = journal.execute(
+        'SELECT id, kind, author_id, post_id, payload, created, state '
+        'FROM entries WHERE state != ? ORDER BY id LIMIT ?',
+        (FAILED, batch_size)
+    ).fetchall()
+    if not entries:
+        return 0, 0
+    ids = [entry[0] for entry in entries]
+    placeholders = ','.join('?' * len(ids))
+    journal.execute(
+        f'UPDATE entries SET state = {CLAIMED} WHERE id IN ({placeholders})',
+        ids
+    )
+    created, failures = _apply(entries)
+    if failures:
+        journal.execute(
+            f'UPDATE entries SET state = {FAILED} '
+            f'WHERE id IN ({",".join("?" * len(failures))})',
+            failures
+        )
+    journal.execute(
+        f'DELETE FROM entries WHERE id IN ({placeholders}) '
+        f'AND state != {FAILED}',
+        ids
+    )
+    return len(entries), created
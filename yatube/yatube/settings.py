@@ -11,7 +11,6 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
-
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -45,12 +44,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'about',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,6 +75,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.cache.fragment_cache',
             ],
         },
     },
@@ -92,6 +94,44 @@ DATABASES = {
     }
 }
 
+# DATABASE_MODE=tuned: WAL и прагмы на каждом соединении, чтения
+# представлений только для чтения идут через отдельное соединение
+# replica к тому же файлу (mode=ro), запись — в default.
+DATABASE_MODE = os.getenv('DATABASE_MODE', 'simple')
+SQLITE_TUNED_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Отрицательное значение — в килобайтах: 64 МБ кэша страниц.
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRAGMAS = {}
+DATABASE_REPLICA = None
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+if DATABASE_MODE == 'tuned':
+    SQLITE_PRAGMAS = SQLITE_TUNED_PRAGMAS
+    DATABASE_REPLICA = 'replica'
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{DATABASES['default']['NAME']}?mode=ro",
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# DATABASE_POOL=1: соединения не закрываются после запроса, а
+# возвращаются в пул процесса (core.db.pool). SIZE — предел открытых
+# соединений на процесс, время — в секундах.
+DATABASE_POOL = {
+    'SIZE': 8,
+    'MAX_LIFETIME': 60 * 60,
+    'CHECK_AFTER': 30,
+    'TIMEOUT': 10,
+}
+if os.getenv('DATABASE_POOL') == '1':
+    for database in DATABASES.values():
+        database['ENGINE'] = 'core.db.backends.pooled_sqlite3'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -141,12 +181,115 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POST_LIMIT = 10
+# Комментариев на странице поста и в каждой догружаемой порции.
+COMMENT_LIMIT = 50
+# Сколько страниц ленты доступно по номеру, дальше — только по курсору.
+PAGE_NUMBER_LIMIT = 5
+# Сколько секунд держать в кэше число записей ленты.
+FEED_COUNT_TIMEOUT = 60 * 60
+# Счётчики лент подписок не правятся при публикации (у автора могут быть
+# миллионы подписчиков), поэтому живут недолго и досчитываются заново.
+FOLLOW_FEED_COUNT_TIMEOUT = 60
+
+# Лента подписок раскладывается по FeedEntry при публикации поста.
+FEED_FANOUT_ENABLED = True
+# Посты авторов с большим числом подписчиков подмешиваются при чтении.
+FEED_FANOUT_MAX_FOLLOWERS = 5000
+# Обратно к раскладке автор возвращается, когда подписчиков становится
+# меньше этого числа: запас не даёт переключать его на каждой подписке.
+FEED_FANOUT_MIN_FOLLOWERS = 4000
+# Потоки, которые копируют посты вернувшегося к раскладке автора в
+# ленты подписчиков. При 0 копирование идёт после коммита в том же
+# потоке.
+FEED_BACKFILL_WORKERS = 1
+FEED_CELEBRITIES_TIMEOUT = 10 * 60
+# Сколько секунд живут версии объектов (posts.versions) и фрагменты
+# шаблонов под ними.
+VERSION_TIMEOUT = 7 * 24 * 60 * 60
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+# Сколько секунд держать в кэше массивы графа подписок (posts.graph).
+FOLLOW_GRAPH_TIMEOUT = 60 * 60
+
+# Поиск: auto — FTS5 на SQLite, иначе обратный индекс SearchTerm;
+# python — всегда обратный индекс.
+SEARCH_BACKEND = 'auto'
+
+# Замеры QueryBudgetMiddleware: сколько запросов хранить на представление.
+QUERY_STATS_BUFFER = 500
+# Предельное число SQL-запросов представления; превышение пишется
+# предупреждением в лог, а при QUERY_BUDGET_RAISE — ошибка.
+QUERY_BUDGETS = {
+    'posts:index': 6,
+    'posts:group_posts': 7,
+    'posts:profile': 9,
+    'posts:post_detail': 6,
+    'posts:follow_index': 8,
+    'posts:search': 8,
+    'posts:post_comments': 2,
+}
+QUERY_BUDGET_RAISE = False
+
+# API (api.views): размер страницы списка по умолчанию и предел ?limit=,
+# max-age ответов в секундах; при 0 клиент каждый раз сверяет ETag.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+API_CACHE_MAX_AGE = 0
+# Предел элементов в одном запросе api:v1:batch.
+API_BATCH_LIMIT = 500
+
+# Полностраничный кэш лент и страниц постов (posts.holes): анонимам —
+# готовая страница, остальным — общая оболочка с личными частями.
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 10 * 60
+
+# Посты и комментарии пишутся в журнал, а в базу — командой
+# process_write_behind пачками. Журнал — отдельный файл SQLite.
+WRITE_BEHIND = os.getenv('WRITE_BEHIND') == '1'
+WRITE_BEHIND_JOURNAL = os.path.join(BASE_DIR, 'write_behind.sqlite3')
+WRITE_BEHIND_BATCH = 200
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Миниатюры создаются в фоне после сохранения поста, а не в запросе.
+THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedThumbnailBackend'
+THUMBNAIL_PREGENERATE = True
+THUMBNAIL_WORKERS = 2
+
+# Уровень кэша выбирается переменной окружения CACHE_BACKEND:
+# locmem — память процесса (по умолчанию), file и sqlite — общий кэш
+# процессов одного хоста, redis — сервер с протоколом Redis,
+# tiered — L1 в памяти процесса поверх общего L2 из CACHE_L2.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
+CACHE_TIERS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION or os.path.join(BASE_DIR, 'cache'),
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': CACHE_LOCATION or os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'redis': {
+        'BACKEND': 'core.cache.redis.RedisCache',
+        'LOCATION': CACHE_LOCATION or 'redis://127.0.0.1:6379/0',
+    },
 }
+if CACHE_BACKEND == 'tiered':
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.tiered.TieredCache',
+            'OPTIONS': {
+                'L2': 'shared',
+                'L1_TIMEOUT': int(os.getenv('CACHE_L1_TIMEOUT', 5)),
+            },
+        },
+        'shared': CACHE_TIERS[os.getenv('CACHE_L2', 'redis')],
+    }
+else:
+    CACHES = {'default': CACHE_TIERS[CACHE_BACKEND]}
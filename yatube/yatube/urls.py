@@ -28,6 +28,8 @@ urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('core/', include('core.urls', namespace='core')),
+    path('api/', include('api.urls', namespace='api')),
 ]
 if settings.DEBUG:
     urlpatterns += static(